@@ -1,6 +1,7 @@
 import logging
 import re
 import json
+from functools import lru_cache
 from django.http import JsonResponse
 
 
@@ -23,9 +24,74 @@ def snake_to_camel(name):
     )
 
 
+class KeyTranslator:
+    """
+    Precomputed camelCase <-> snake_case key tables.
+
+    Known keys (serializer field names registered at startup) are translated with a
+    single dict lookup. Unknown keys fall back to camel_to_snake / snake_to_camel
+    through a bounded LRU cache. Hit/miss counters are exposed via stats().
+    """
+
+    def __init__(self, maxsize=2048):
+        self.to_camel_table = {}
+        self.to_snake_table = {}
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._to_camel_fallback = lru_cache(maxsize=maxsize)(snake_to_camel)
+        self._to_snake_fallback = lru_cache(maxsize=maxsize)(camel_to_snake)
+
+    def register(self, names):
+        for name in names:
+            camel = snake_to_camel(name)
+            self.to_camel_table[name] = camel
+            self.to_snake_table[camel] = camel_to_snake(camel)
+            self.to_snake_table[name] = camel_to_snake(name)
+
+    def register_serializers(self, serializer_classes):
+        """Register the declared and Meta field names of the given serializer classes."""
+        for serializer_class in serializer_classes:
+            names = set(getattr(serializer_class, '_declared_fields', {}))
+            meta_fields = getattr(getattr(serializer_class, 'Meta', None), 'fields', None)
+            if isinstance(meta_fields, (list, tuple)):
+                names.update(meta_fields)
+            self.register(names)
+
+    def to_camel(self, key):
+        try:
+            value = self.to_camel_table[key]
+        except KeyError:
+            self.misses += 1
+            return self._to_camel_fallback(key)
+        self.hits += 1
+        return value
+
+    def to_snake(self, key):
+        try:
+            value = self.to_snake_table[key]
+        except KeyError:
+            self.misses += 1
+            return self._to_snake_fallback(key)
+        self.hits += 1
+        return value
+
+    def stats(self):
+        return {
+            'known_keys': len(self.to_camel_table),
+            'hits': self.hits,
+            'misses': self.misses,
+            'to_camel_cache': self._to_camel_fallback.cache_info()._asdict(),
+            'to_snake_cache': self._to_snake_fallback.cache_info()._asdict(),
+        }
+
+
+key_translator = KeyTranslator()
+
+
 def convert_keys_to_snake_case(data):
     if isinstance(data, dict):
-        return {camel_to_snake(k): convert_keys_to_snake_case(v) for k, v in data.items()}
+        return {key_translator.to_snake(k): convert_keys_to_snake_case(v) for k, v in data.items()}
     elif isinstance(data, list):
         return [convert_keys_to_snake_case(item) for item in data]
     return data
@@ -33,32 +99,37 @@ def convert_keys_to_snake_case(data):
 
 def convert_keys_to_camel_case(data):
     if isinstance(data, dict):
-        return {snake_to_camel(k): convert_keys_to_camel_case(v) for k, v in data.items()}
+        return {key_translator.to_camel(k): convert_keys_to_camel_case(v) for k, v in data.items()}
     elif isinstance(data, list):
         return [convert_keys_to_camel_case(item) for item in data]
     return data
 
 
 class CamelSnakeCaseMiddleware:
+    """
+    Fallback key conversion for non-DRF views (plain Django views and JsonResponse returns).
+    DRF requests are parsed by CamelCaseJSONParser and DRF responses are rendered by
+    CamelCaseJSONRenderer, so they are left untouched here.
+    """
+
     def __init__(self, get_response):
+        # Imported here: the DRF renderer/parser import this module while DRF settings load.
+        from rest_framework.response import Response
+        from rest_framework.views import APIView
+
         self.get_response = get_response
+        self.drf_response_class = Response
+        self.drf_view_class = APIView
 
     def __call__(self, request):
-        # 🐍 Convert request keys: camelCase → snake_case
+        response = self.get_response(request)
+
         if (
-            request.content_type == 'application/json'
-            and request.body
+            isinstance(response, self.drf_response_class)
+            or getattr(response, 'streaming', False)
+            or response.has_header('Content-Encoding')  # already compressed: the body is not JSON text
         ):
-            try:
-                body_unicode = request.body.decode('utf-8')
-                data = json.loads(body_unicode)
-                converted_data = convert_keys_to_snake_case(data)
-                request._body = json.dumps(converted_data).encode('utf-8')
-                # print("converted == ", converted_data)
-            except json.JSONDecodeError:
-                return JsonResponse({'error': 'Invalid JSON'}, status=400)
-
-        response = self.get_response(request)
+            return response
 
         try:
             if hasattr(response, 'content') and response.get('Content-Type') == 'application/json':
@@ -75,3 +146,23 @@ class CamelSnakeCaseMiddleware:
             pass  # Fail-safe
 
         return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # 🐍 Convert request keys: camelCase → snake_case (non-DRF views only)
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is not None and issubclass(view_class, self.drf_view_class):
+            return None
+
+        if (
+            request.content_type == 'application/json'
+            and request.body
+        ):
+            try:
+                body_unicode = request.body.decode('utf-8')
+                data = json.loads(body_unicode)
+                converted_data = convert_keys_to_snake_case(data)
+                request._body = json.dumps(converted_data).encode('utf-8')
+                # print("converted == ", converted_data)
+            except json.JSONDecodeError:
+                return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        return None
@@ -0,0 +1,168 @@
+import gzip
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from core.cache import CACHE_ERRORS, cache_metrics
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+
+ACCEPT_ENCODING_RE = re.compile(r'^\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def accepted_encodings(header):
+    """Content codings from an Accept-Encoding header with a non-zero q-value, mapped to their q-value."""
+    accepted = {}
+    for item in header.split(','):
+        match = ACCEPT_ENCODING_RE.match(item)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        accepted[match.group(1).lower()] = quality
+    return {coding: quality for coding, quality in accepted.items() if quality > 0}
+
+
+def negotiate_encoding(header, offered=('br', 'gzip')):
+    """The coding to send for this Accept-Encoding: the highest q-value wins, brotli on ties; None for identity."""
+    accepted = accepted_encodings(header)
+    offered = [coding for coding in offered if coding != 'br' or brotli is not None]
+    best, best_quality = None, 0
+    for coding in offered:
+        quality = accepted.get(coding, accepted.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding, max_random_bytes=None):
+    if encoding == 'gzip':
+        yield from compress_sequence(chunks, max_random_bytes=max_random_bytes)
+        return
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compression_exempt(view_func):
+    """Marks a view's responses to be sent uncompressed by CompressionMiddleware (e.g. ones carrying tokens)."""
+
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        response = view_func(*args, **kwargs)
+        response.compression_exempt = True
+        return response
+
+    return wrapper
+
+
+def weaken_etag(response):
+    # A strong ETag names one byte sequence; the encoded body is another (RFC 9110 section 8.8.1)
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON responses with the best coding the client accepts (brotli, then gzip).
+
+    Bodies under COMPRESSION_MIN_SIZE bytes and views marked ``compression_exempt`` are
+    sent as they are. Responses that carry an ETag (the catalog responses, see
+    core.conditional) are public and the same bytes for many clients, so their
+    compressed variants are kept in the catalog cache, keyed by coding and a digest of
+    the uncompressed body: a hit costs a hash and a cache read, and no compression.
+    Every other response may mix a secret with reflected input, so, like Django's
+    GZipMiddleware, it is gzipped with up to ``max_random_bytes`` of random padding
+    against BREACH (brotli has no room for it and is not offered). Must be listed first
+    in MIDDLEWARE so it sees the final body, after CamelSnakeCaseMiddleware has
+    rewritten it.
+    """
+
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.variant_cache = caches[settings.CATALOG_CACHE_ALIAS]
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(response, 'compression_exempt', False) or response.has_header('Content-Encoding'):
+            return response
+
+        shared = response.has_header('ETag')
+        offered = ('br', 'gzip') if shared else ('gzip',)
+        if response.status_code == 304:
+            # Same Vary and validator as the 200 it stands for
+            if shared:
+                patch_vary_headers(response, ('Accept-Encoding',))
+                if negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), offered) is not None:
+                    weaken_etag(response)
+            return response
+        if (
+            response.status_code != 200
+            or not response.get('Content-Type', '').startswith('application/json')
+            or (not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), offered)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            padding = None if shared else self.max_random_bytes
+            response.streaming_content = compress_stream(response.streaming_content, encoding, padding)
+            del response.headers['Content-Length']
+        else:
+            if shared:
+                compressed = self.compressed_content(response, encoding)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        weaken_etag(response)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def compressed_content(self, response, encoding):
+        digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        key = f'compressed:{encoding}:{digest}'
+        try:
+            compressed = self.variant_cache.get(key)
+        except CACHE_ERRORS:
+            return compress(response.content, encoding)
+        if compressed is not None:
+            cache_metrics.record('compression', 'hit')
+            return compressed
+        compressed = compress(response.content, encoding)
+        try:
+            self.variant_cache.set(key, compressed, timeout=settings.COMPRESSION_CACHE_TIMEOUT)
+        except CACHE_ERRORS:
+            pass
+        cache_metrics.record('compression', 'miss')
+        return compressed
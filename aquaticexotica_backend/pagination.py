@@ -1,5 +1,18 @@
 # pagination.py
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 #
 # class FlatPageNumberPagination(PageNumberPagination):
@@ -12,3 +25,254 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = "page_size"
     max_page_size = 20
 
+
+class EstimatedPage(Page):
+    """A page of an estimated-count paginator: ``has_next`` comes from probing one row past it."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django paginator that skips the exact COUNT(*) on big tables.
+
+    When the planner thinks the base table holds at least ESTIMATED_COUNT_THRESHOLD
+    rows, ``count`` is the planner estimate: ``pg_class.reltuples`` for an unfiltered
+    queryset, the EXPLAIN row estimate otherwise. Smaller tables, and results that fit
+    in one page, get an exact count. ``count_is_estimated`` tells which one was used.
+    Works for the admin changelist (``ModelAdmin.paginator``) as well as DRF
+    (EstimatedCountPagination).
+
+    An estimate is only reported, never trusted: page numbers are not checked against
+    it, and each page reads one extra row to know whether another page follows.
+    """
+
+    count_is_estimated = False
+
+    def table_estimate(self, queryset, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been vacuumed/analyzed
+        return row[0] if row and row[0] >= 0 else None
+
+    def query_estimate(self, queryset):
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet):
+            connection = connections[queryset.db]
+            if connection.vendor == "postgresql":
+                table_rows = self.table_estimate(queryset, connection)
+                if table_rows is not None and table_rows >= settings.ESTIMATED_COUNT_THRESHOLD:
+                    # Bounded exact count: single-page results are exact, and the estimate never
+                    # hides a second page (the admin shows everything when count <= per_page)
+                    at_least = queryset[:self.per_page + 1].count()
+                    if at_least <= self.per_page:
+                        return at_least
+                    self.count_is_estimated = True
+                    if not queryset.query.where and not queryset.query.distinct:
+                        return max(table_rows, at_least)
+                    return max(self.query_estimate(queryset), at_least)
+        return super().count
+
+    def validate_number(self, number):
+        if not self.count_is_estimated:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        self.count  # decides count_is_estimated
+        if not self.count_is_estimated:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return EstimatedPage(rows[:self.per_page], number, self, has_next=len(rows) > self.per_page)
+
+
+class EstimatedCountPagination(StandardResultsSetPagination):
+    """Page-number pagination whose ``count`` may be a planner estimate (flagged by ``count_estimated``)."""
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.page.paginator.count,
+            "count_estimated": self.page.paginator.count_is_estimated,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a composite ordering such as ``("-updated_at", "id")``.
+
+    The opaque cursor carries the ordering values of the edge row, and the next page is
+    fetched with a seek predicate against them, so every page is an index range scan
+    starting at the cursor on a matching composite index: no COUNT(*) and no OFFSET. Views set ``cursor_ordering``; the last
+    field must be unique (the primary key) to keep the ordering total.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 20
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def encode_cursor(self, values, reverse):
+        # Full precision isoformat: DjangoJSONEncoder truncates datetimes to milliseconds
+        values = [value.isoformat() if hasattr(value, "isoformat") else value for value in values]
+        payload = json.dumps({"p": values, "r": int(reverse)}, default=str)
+        encoded = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            values = payload["p"]
+            fields = [queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering]
+            if len(values) != len(fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(fields, values)]
+            return position, bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError, binascii.Error, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        return tuple(name[1:] if name.startswith("-") else f"-{name}" for name in ordering)
+
+    @staticmethod
+    def seek_filter(ordering, position):
+        """
+        Rows strictly after ``position`` in ``ordering``: a >= x AND ((a > x) OR (a = x AND b > y) ...).
+
+        The standalone bound on the leading column is what the index scan starts from;
+        without it Postgres can only apply the OR as a filter over every earlier row.
+        (A row comparison ``(a, b) > (x, y)`` would only do for orderings in one direction.)
+        """
+        leading = ordering[0]
+        bound = "lte" if leading.startswith("-") else "gte"
+        condition = Q()
+        for i, name in enumerate(ordering):
+            field = name.lstrip("-")
+            lookup = "lt" if name.startswith("-") else "gt"
+            step = Q(**{f"{field}__{lookup}": position[i]})
+            for previous, value in zip(ordering[:i], position[:i]):
+                step &= Q(**{previous.lstrip("-"): value})
+            condition |= step
+        return Q(**{f"{leading.lstrip('-')}__{bound}": position[0]}) & condition
+
+    def position_of(self, item):
+        values = []
+        for name in self.ordering:
+            field = name.lstrip("-")
+            values.append(item[field] if isinstance(item, dict) else getattr(item, field))
+        return values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = tuple(getattr(view, "cursor_ordering", self.ordering))
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset)
+
+        ordering = self.reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, position))
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        # Going backwards, "more" rows lie before this page; the page we came from is after it.
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.first_position = self.position_of(results[0]) if results else None
+        self.last_position = self.position_of(results[-1]) if results else None
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+
+class CursorOptInPagination(EstimatedCountPagination):
+    """
+    Page-number pagination (with estimated counts on big tables) by default; keyset
+    pagination when the request carries ``?cursor=`` (empty for the first page), so
+    existing clients keep working.
+    """
+
+    keyset_class = KeysetPagination
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset is not None:
+            return ""
+        return super().to_html()
@@ -0,0 +1,12 @@
+# parsers.py
+from rest_framework.parsers import JSONParser
+
+from aquaticexotica_backend.middleware.camelsnakecase_middleware import convert_keys_to_snake_case
+
+
+class CamelCaseJSONParser(JSONParser):
+    """JSON parser that converts incoming camelCase keys to snake_case while parsing."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        data = super().parse(stream, media_type=media_type, parser_context=parser_context)
+        return convert_keys_to_snake_case(data)
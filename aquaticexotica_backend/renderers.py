@@ -0,0 +1,15 @@
+# renderers.py
+from rest_framework.renderers import JSONRenderer
+
+from aquaticexotica_backend.middleware.camelsnakecase_middleware import convert_keys_to_camel_case
+
+
+class CamelCaseJSONRenderer(JSONRenderer):
+    """JSON renderer that converts snake_case keys to camelCase before encoding, so the payload is encoded once."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(
+            convert_keys_to_camel_case(data),
+            accepted_media_type=accepted_media_type,
+            renderer_context=renderer_context,
+        )
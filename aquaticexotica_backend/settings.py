@@ -61,6 +61,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
     'authapp',
     'core',
     'rest_framework',
@@ -71,6 +72,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so it compresses the final body (after CamelSnakeCaseMiddleware's rewrite)
+    'aquaticexotica_backend.middleware.compression_middleware.CompressionMiddleware',
     'aquaticexotica_backend.middleware.camelsnakecase_middleware.CamelSnakeCaseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -187,9 +190,24 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
+    # camelCase <-> snake_case conversion happens while parsing / rendering;
+    # CamelSnakeCaseMiddleware only handles non-DRF views.
+    'DEFAULT_RENDERER_CLASSES': (
+        'aquaticexotica_backend.renderers.CamelCaseJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'aquaticexotica_backend.parsers.CamelCaseJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 
+# Paginated lists over tables with at least this many rows (planner estimate) report an estimated count
+ESTIMATED_COUNT_THRESHOLD = config('ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
@@ -213,8 +231,56 @@ CACHES = {
                 'ssl_cert_reqs': None,  # For Upstash Redis
             }
         }
+    },
+    # Per-process LRU in front of 'default', invalidated across workers over Redis pub/sub
+    'tiered': {
+        'BACKEND': 'aquaticexotica_backend.tiered_cache.TieredCache',
+        'OPTIONS': {
+            'BACKEND_ALIAS': 'default',
+            'MAX_ENTRIES': config('TIERED_CACHE_MAX_ENTRIES', default=10000, cast=int),
+            'LOCAL_TIMEOUT': config('TIERED_CACHE_LOCAL_TIMEOUT', default=30, cast=int),
+            'CHANNEL': 'cache-invalidation',
+        }
     }
 }
+# Cache alias for hot catalog reads: catalog version, list responses, categories, product representations
+CATALOG_CACHE_ALIAS = config('CATALOG_CACHE_ALIAS', default='tiered')
+# Stampede protection (core.cache.get_or_compute): expired values are served for CACHE_STALE_SECONDS
+# while one worker holding the lock (CACHE_LOCK_TIMEOUT) recomputes; cold misses wait up to CACHE_LOCK_WAIT.
+# CACHE_XFETCH_BETA > 1 favours earlier probabilistic refreshes.
+CACHE_STALE_SECONDS = config('CACHE_STALE_SECONDS', default=300, cast=int)
+CACHE_LOCK_TIMEOUT = config('CACHE_LOCK_TIMEOUT', default=30, cast=int)
+CACHE_LOCK_WAIT = config('CACHE_LOCK_WAIT', default=2.0, cast=float)
+CACHE_XFETCH_BETA = config('CACHE_XFETCH_BETA', default=1.0, cast=float)
+
+# Product search
+# Minimum pg_trgm word similarity for fuzzy (typo tolerant) product search and suggestions
+FUZZY_SEARCH_THRESHOLD = config('FUZZY_SEARCH_THRESHOLD', default=0.3, cast=float)
+FUZZY_SEARCH_MAX_RESULTS = config('FUZZY_SEARCH_MAX_RESULTS', default=100, cast=int)
+# The in-process autocomplete index is rebuilt in the background this often (writes from other workers)
+AUTOCOMPLETE_REFRESH_SECONDS = config('AUTOCOMPLETE_REFRESH_SECONDS', default=300, cast=int)
+# Product list facets (?facets=true): lower bounds of the price histogram buckets, and cache lifetime
+FACET_PRICE_BUCKETS = [0, 100, 250, 500, 1000, 2500, 5000]
+FACET_CACHE_TIMEOUT = config('FACET_CACHE_TIMEOUT', default=300, cast=int)
+
+# Product caching
+# Cached list representation of each product, used to hydrate collections
+PRODUCT_CACHE_TIMEOUT = config('PRODUCT_CACHE_TIMEOUT', default=3600, cast=int)
+# Featured/trending/new/sale sorted sets are rebuilt from SQL this often, to pick up bulk updates
+MERCHANDISING_REBUILD_SECONDS = config('MERCHANDISING_REBUILD_SECONDS', default=3600, cast=int)
+# List response caches (core.cache.CachedListMixin); every catalog write retires them via catalog:v<N>
+PRODUCT_LIST_CACHE_TIMEOUT = config('PRODUCT_LIST_CACHE_TIMEOUT', default=300, cast=int)
+TAG_LIST_CACHE_TIMEOUT = config('TAG_LIST_CACHE_TIMEOUT', default=3600, cast=int)
+# Categories with in-stock product counts (/categories and the admin)
+CATEGORY_CATALOG_TIMEOUT = config('CATEGORY_CATALOG_TIMEOUT', default=3600, cast=int)
+
+# Response compression (CompressionMiddleware): JSON bodies of at least COMPRESSION_MIN_SIZE bytes are
+# sent brotli (when the brotli package is installed) or gzip encoded. Compressed variants of catalog
+# responses are cached for COMPRESSION_CACHE_TIMEOUT seconds, so levels can favour size over speed.
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_CACHE_TIMEOUT = config('COMPRESSION_CACHE_TIMEOUT', default=3600, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
 
 
 AUTH_USER_MODEL = 'core.User'
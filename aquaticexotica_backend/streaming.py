@@ -0,0 +1,63 @@
+# streaming.py
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.response import Response
+from rest_framework.utils import encoders
+
+from aquaticexotica_backend.middleware.camelsnakecase_middleware import convert_keys_to_camel_case
+
+
+def iter_json_array(rows, batch_size=100):
+    """
+    Yield a JSON array chunk by chunk. Each row is camelized and encoded on its own,
+    and rows are flushed in batches so the array is never held in memory as a whole.
+    """
+    buffer = ['[']
+    first = True
+    for row in rows:
+        if not first:
+            buffer.append(',')
+        first = False
+        buffer.append(json.dumps(
+            convert_keys_to_camel_case(row), cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':')
+        ))
+        if len(buffer) >= batch_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+    buffer.append(']')
+    yield ''.join(buffer).encode('utf-8')
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    def __init__(self, rows, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(iter_json_array(rows), **kwargs)
+
+
+class StreamingListMixin:
+    """
+    Lets a viewset answer selected list actions with a streamed JSON array.
+
+    Actions named in ``stream_actions`` iterate the queryset with
+    ``.iterator(chunk_size=stream_chunk_size)`` and serialize one row at a time,
+    so peak memory does not grow with the result size. Other actions return a
+    regular DRF ``Response``.
+    """
+
+    stream_actions = ()
+    stream_chunk_size = 500
+
+    def list_response(self, queryset):
+        if self.action in self.stream_actions:
+            return self.streaming_response(queryset)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    def streaming_response(self, queryset):
+        serializer = self.get_serializer()
+        rows = (
+            serializer.to_representation(instance)
+            for instance in queryset.iterator(chunk_size=self.stream_chunk_size)
+        )
+        return StreamingJSONResponse(rows)
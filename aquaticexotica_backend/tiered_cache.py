@@ -0,0 +1,289 @@
+# tiered_cache.py
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django_redis import get_redis_connection
+
+logger = logging.getLogger('core')
+
+MISSING = object()
+
+
+class LocalLRU:
+    """Bounded in-process LRU with per-entry expiry. Values are stored pickled, so callers never share objects."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, pickled value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            data = entry[1]
+        return pickle.loads(data)
+
+    def set(self, key, value, ttl):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, data)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class LocalTier:
+    """
+    The process-wide half of a TieredCache: the LRU, the invalidation listener and the
+    hit counters. Django builds one cache backend instance per thread, so this state
+    is shared through ``LocalTier.for_options`` rather than held by the backend.
+    """
+
+    instances = {}
+    instances_lock = threading.Lock()
+
+    @classmethod
+    def for_options(cls, backend_alias, channel, max_entries):
+        with cls.instances_lock:
+            key = (backend_alias, channel)
+            if key not in cls.instances:
+                cls.instances[key] = cls(backend_alias, channel, max_entries)
+            return cls.instances[key]
+
+    def __init__(self, backend_alias, channel, max_entries):
+        self.backend_alias = backend_alias
+        self.channel = channel
+        self.lru = LocalLRU(max_entries)
+        self.sender = uuid.uuid4().hex
+        self.hits = {'local': 0, 'remote': 0}
+        self.misses = 0
+        self.listener_pid = None
+        self.listener_lock = threading.Lock()
+
+    def ensure_listener(self):
+        # Checked per call: a listener started before a (gunicorn) fork does not survive in the child
+        if self.listener_pid == os.getpid():
+            return
+        with self.listener_lock:
+            if self.listener_pid != os.getpid():
+                self.lru.clear()
+                self.sender = uuid.uuid4().hex
+                self.listener_pid = os.getpid()
+                threading.Thread(target=self.listen, name='tiered-cache-invalidation', daemon=True).start()
+
+    def listen(self):
+        pid = os.getpid()
+        while self.listener_pid == pid:
+            try:
+                pubsub = get_redis_connection(self.backend_alias).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Anything published while we were not subscribed may have been missed
+                self.lru.clear()
+                while self.listener_pid == pid:
+                    message = pubsub.get_message(timeout=5.0)
+                    if message is not None:
+                        self.on_message(message['data'])
+            except Exception as e:
+                logger.error(f"Tiered cache invalidation listener error, resubscribing: {str(e)}")
+                time.sleep(1)
+
+    def on_message(self, data):
+        message = json.loads(data)
+        if message['sender'] == self.sender:
+            return
+        if message.get('clear'):
+            self.lru.clear()
+        else:
+            self.lru.delete(message['keys'])
+
+    def publish(self, keys=(), clear=False):
+        message = json.dumps({'sender': self.sender, 'keys': list(keys), 'clear': clear})
+        get_redis_connection(self.backend_alias).publish(self.channel, message)
+
+    def forget(self, keys):
+        self.lru.delete(keys)
+        self.publish(keys)
+
+    def stats(self):
+        lookups = self.hits['local'] + self.hits['remote'] + self.misses
+        return {
+            'local': {'hits': self.hits['local'], 'hit_ratio': round(self.hits['local'] / lookups, 3) if lookups else None},
+            'remote': {'hits': self.hits['remote'], 'hit_ratio': round(self.hits['remote'] / lookups, 3) if lookups else None},
+            'misses': self.misses,
+            'local_entries': len(self.lru),
+        }
+
+
+class TieredCache(BaseCache):
+    """
+    Two-tier Django cache: a per-process LRU in front of another cache alias
+    (``CACHES['default']``, i.e. django_redis).
+
+    Reads are served from the LRU when possible; misses go to Redis (``get_many`` is a
+    single MGET) and are kept locally for at most ``LOCAL_TIMEOUT`` seconds, which also
+    bounds how stale a local entry can get if an invalidation is lost. Every write or
+    delete goes to Redis first and is then broadcast on a Redis pub/sub channel; a
+    listener thread in each process evicts the affected keys, so workers on every node
+    drop stale entries promptly. The LRU is cleared whenever the subscription is
+    (re-)established.
+
+    OPTIONS: ``BACKEND_ALIAS`` (default "default"), ``MAX_ENTRIES`` (10000),
+    ``LOCAL_TIMEOUT`` (30) and ``CHANNEL`` ("cache-invalidation").
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.backend_alias = options.get('BACKEND_ALIAS', 'default')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 30)
+        self.tier = LocalTier.for_options(
+            self.backend_alias, options.get('CHANNEL', 'cache-invalidation'), options.get('MAX_ENTRIES', 10000)
+        )
+        self.local = self.tier.lru
+
+    @property
+    def remote(self):
+        return caches[self.backend_alias]
+
+    def local_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.remote.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def remember(self, key, value, timeout):
+        ttl = self.local_ttl(timeout)
+        if ttl > 0:
+            self.local.set(key, value, ttl)
+
+    def stats(self):
+        return self.tier.stats()
+
+    # ----- cache API -----
+
+    def get(self, key, default=None, version=None):
+        self.tier.ensure_listener()
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self.local.get(local_key)
+        if value is not MISSING:
+            self.tier.hits['local'] += 1
+            return value
+        value = self.remote.get(key, MISSING, version=version)
+        if value is MISSING:
+            self.tier.misses += 1
+            return default
+        self.tier.hits['remote'] += 1
+        self.remember(local_key, value, DEFAULT_TIMEOUT)
+        return value
+
+    def get_many(self, keys, version=None):
+        self.tier.ensure_listener()
+        found, remaining = {}, []
+        for key in keys:
+            value = self.local.get(self.make_and_validate_key(key, version=version))
+            if value is MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+        self.tier.hits['local'] += len(found)
+        if remaining:
+            fetched = self.remote.get_many(remaining, version=version)
+            self.tier.hits['remote'] += len(fetched)
+            self.tier.misses += len(remaining) - len(fetched)
+            for key, value in fetched.items():
+                self.remember(self.make_and_validate_key(key, version=version), value, DEFAULT_TIMEOUT)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        if self.local.get(self.make_and_validate_key(key, version=version)) is not MISSING:
+            return True
+        return self.remote.has_key(key, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.tier.ensure_listener()
+        self.remote.set(key, value, timeout=timeout, version=version)
+        local_key = self.make_and_validate_key(key, version=version)
+        self.tier.publish([local_key])
+        self.remember(local_key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.tier.ensure_listener()
+        added = self.remote.add(key, value, timeout=timeout, version=version)
+        if added:
+            local_key = self.make_and_validate_key(key, version=version)
+            self.tier.publish([local_key])
+            self.remember(local_key, value, timeout)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self.tier.ensure_listener()
+        # django-redis returns None rather than the (empty) list of failed keys
+        failed = list(self.remote.set_many(data, timeout=timeout, version=version) or [])
+        local_keys = {key: self.make_and_validate_key(key, version=version) for key in data}
+        self.tier.publish(local_keys.values())
+        for key, value in data.items():
+            if key not in failed:
+                self.remember(local_keys[key], value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.remote.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.tier.ensure_listener()
+        deleted = self.remote.delete(key, version=version)
+        self.tier.forget([self.make_and_validate_key(key, version=version)])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        self.tier.ensure_listener()
+        keys = list(keys)
+        self.remote.delete_many(keys, version=version)
+        self.tier.forget([self.make_and_validate_key(key, version=version) for key in keys])
+
+    def incr(self, key, delta=1, version=None):
+        self.tier.ensure_listener()
+        value = self.remote.incr(key, delta, version=version)
+        self.tier.forget([self.make_and_validate_key(key, version=version)])
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self.tier.ensure_listener()
+        self.remote.clear()
+        self.local.clear()
+        self.tier.publish(clear=True)
+
+    def close(self, **kwargs):
+        # The LRU and the listener live for the whole process, unlike per-request connections
+        pass
@@ -1,5 +1,7 @@
 from django.urls import path
 
+from aquaticexotica_backend.middleware.compression_middleware import compression_exempt
+
 from .views import (
     SignupView,
     SigninView,
@@ -10,12 +12,13 @@ from .views import (
     CreateFirstAdminView,
 )
 
+# Tokens and account details are never compressed (BREACH)
 urlpatterns = [
-    path('signup', SignupView.as_view(), name='signup'),
-    path('login', SigninView.as_view(), name='login'),
-    path('logout', LogoutView.as_view(), name='logout'),
-    path('me/', MeView.as_view(), name='me'),
-    path('admin-status', AdminStatusView.as_view(), name='admin_status'),
-    path('update-profile', UpdateProfileView.as_view(), name='update_profile'),
-    path('create-first-admin', CreateFirstAdminView.as_view(), name='create_first_admin'),
+    path('signup', compression_exempt(SignupView.as_view()), name='signup'),
+    path('login', compression_exempt(SigninView.as_view()), name='login'),
+    path('logout', compression_exempt(LogoutView.as_view()), name='logout'),
+    path('me/', compression_exempt(MeView.as_view()), name='me'),
+    path('admin-status', compression_exempt(AdminStatusView.as_view()), name='admin_status'),
+    path('update-profile', compression_exempt(UpdateProfileView.as_view()), name='update_profile'),
+    path('create-first-admin', compression_exempt(CreateFirstAdminView.as_view()), name='create_first_admin'),
 ]
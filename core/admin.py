@@ -1,10 +1,14 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.core.cache import cache
 from django.utils.html import format_html
 import logging
+
+from aquaticexotica_backend.pagination import EstimatedCountPaginator
+from .category_catalog import get_category_product_counts
 from .models import (
     User, ShippingAddress, Category, Product, ProductImage,
-    Cart, Order, OrderItem, StockNotification, CartItem
+    Cart, Order, OrderItem, StockNotification, CartItem, SynonymGroup
 )
 
 logger = logging.getLogger('core')
@@ -71,6 +75,16 @@ class ProductInline(admin.TabularInline):
     product.short_description = "Product"
 
 
+class CategoryChangeList(ChangeList):
+    """Attaches product counts from the category catalog cache to the page of categories."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        counts = get_category_product_counts()
+        for category in self.result_list:
+            category.cached_product_count = counts.get(category.pk, 0)
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug', 'product_count')
@@ -79,22 +93,23 @@ class CategoryAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     inlines = [ProductInline]
 
+    def get_changelist(self, request, **kwargs):
+        return CategoryChangeList
+
     def product_count(self, obj):
-        return obj.products.count()  # ✅ still works with M2M (thanks to related_name='products')
+        if hasattr(obj, 'cached_product_count'):
+            return obj.cached_product_count
+        return get_category_product_counts().get(obj.pk, 0)
 
-    product_count.short_description = 'Products'
+    product_count.short_description = 'Products in stock'
 
     def save_model(self, request, obj, form, change):
         logger.info(f"Admin {request.user.username} {'updated' if change else 'created'} category: {obj.name}")
         super().save_model(request, obj, form, change)
-        # cache.delete('all_categories')
-        # cache.delete_pattern('products_*')
 
     def delete_model(self, request, obj):
         logger.info(f"Admin {request.user.username} deleted category: {obj.name}")
         super().delete_model(request, obj)
-        # cache.delete('all_categories')
-        # cache.delete_pattern('products_*')
 
 
 class ProductTagInline(admin.TabularInline):
@@ -154,12 +169,10 @@ class ProductCategoryInline(admin.TabularInline):
 #     def save_model(self, request, obj, form, change):
 #         logger.info(f"{'Updating' if change else 'Creating'} product: {obj.name}")
 #         super().save_model(request, obj, form, change)
-#         # cache.delete_pattern('products_*')
 #
 #     def delete_model(self, request, obj):
 #         logger.info(f"Deleting product: {obj.name}")
 #         super().delete_model(request, obj)
-#         # cache.delete_pattern('products_*')
 
 
 class CartItemInline(admin.TabularInline):
@@ -190,6 +203,8 @@ class OrderItemInline(admin.TabularInline):
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'total_amount', 'shipping_cost', 'grand_total', 'status', 'created_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_filter = ('status', 'created_at')
     search_fields = ('user__username', 'user__email', 'id')
     readonly_fields = ('created_at', 'updated_at')
@@ -221,6 +236,8 @@ class CartItemAdmin(admin.ModelAdmin):
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('order', 'product', 'quantity', 'price', 'total_price', 'created_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_filter = ('created_at',)
     search_fields = ('order__user__username', 'product__name')
     raw_id_fields = ('order', 'product')
@@ -238,3 +255,15 @@ class StockNotificationAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         logger.info(f"Admin {request.user.username} {'updated' if change else 'created'} stock notification for user: {obj.user.username}")
         super().save_model(request, obj, form, change)
+
+
+@admin.register(SynonymGroup)
+class SynonymGroupAdmin(admin.ModelAdmin):
+    list_display = ('terms', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('terms',)
+    readonly_fields = ('created_at', 'updated_at')
+
+    def save_model(self, request, obj, form, change):
+        logger.info(f"Admin {request.user.username} {'updated' if change else 'created'} synonym group: {obj.terms}")
+        super().save_model(request, obj, form, change)
@@ -8,3 +8,31 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         import core.signals
+        self.register_serializer_keys()
+        self.compile_serializers()
+
+    def register_serializer_keys(self):
+        """Build the camelCase/snake_case key tables from every loaded serializer's field names."""
+        from rest_framework import serializers
+        from aquaticexotica_backend.middleware.camelsnakecase_middleware import key_translator
+        import core.serializers  # noqa: F401 - make sure the core serializers are loaded
+
+        pending, seen = [serializers.Serializer], set()
+        while pending:
+            serializer_class = pending.pop()
+            if serializer_class in seen:
+                continue
+            seen.add(serializer_class)
+            pending.extend(serializer_class.__subclasses__())
+        key_translator.register_serializers(seen)
+
+    def compile_serializers(self):
+        """Build the representation plans of the core serializers once, before the first request."""
+        from core import serializers
+        from core.compiled_serializers import CompiledModelSerializer, serializer_compiler
+
+        serializer_compiler.compile_all(
+            value for value in vars(serializers).values()
+            if isinstance(value, type) and issubclass(value, CompiledModelSerializer)
+            and value is not CompiledModelSerializer
+        )
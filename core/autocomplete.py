@@ -0,0 +1,280 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q
+
+from .models import Product, Tag, Category, OrderItem
+
+logger = logging.getLogger('core')
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class TrieNode:
+    __slots__ = ('children', 'keys', 'top', 'stale')
+
+    def __init__(self):
+        self.children = {}
+        self.keys = set()   # every entry with a token starting with this node's prefix
+        self.top = []       # the best TOP_K of ``keys`` as sorted (rank, key) pairs, kept current in place
+        self.stale = False  # ``top`` lost an entry it cannot refill without a scan of ``keys``
+
+
+class PrefixIndex:
+    """
+    Prefix trie over entry labels, ranked by popularity.
+
+    Entries are keyed by ``(type, id)``. Each token of a label is inserted into the
+    trie and every node on its path remembers the entry, plus a bounded ranking of
+    its best ``top_k`` entries. A change moves one entry within those rankings
+    (a bisect per node on the path), so a lookup is a walk down the prefix plus a
+    read of at most ``top_k`` entries. Only a demoted or removed top entry leaves a
+    ranking short; that node is refilled from its keys on its next read.
+    """
+
+    def __init__(self, top_k=32):
+        self.root = TrieNode()
+        self.entries = {}  # key -> (label, popularity, tokens)
+        self.top_k = top_k
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _nodes(self, token, create=False):
+        node = self.root
+        for char in token:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return
+                child = node.children[char] = TrieNode()
+            node = child
+            yield node
+
+    def _node(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _path(self, tokens, create=False):
+        """Distinct nodes on the paths of ``tokens`` (tokens sharing a prefix share nodes)."""
+        nodes = {}
+        for token in tokens:
+            for node in self._nodes(token, create):
+                nodes[id(node)] = node
+        return nodes
+
+    @staticmethod
+    def _rank(key, label, popularity):
+        return (-popularity, label, key)
+
+    def _place(self, node, old, new):
+        """
+        Move an entry of ``node`` from ranking ``old`` to ``new`` (None: not under the
+        node) in ``node.top``. Called after ``node.keys`` was updated.
+        """
+        top = node.top
+        was_ranked = False
+        if old is not None:
+            position = bisect.bisect_left(top, old)
+            if position < len(top) and top[position] == old:
+                del top[position]
+                was_ranked = True
+        if new is None:
+            if was_ranked and len(node.keys) > len(top):
+                node.stale = True  # a key outside the ranking should move up
+            return
+        if was_ranked:
+            outside = len(node.keys) - len(top) - 1
+            if outside > 0 and (not top or new > top[-1]):
+                node.stale = True  # demoted past the end: some key outside may now rank higher
+                return
+            bisect.insort(top, new)
+        elif len(top) < self.top_k or new < top[-1]:
+            bisect.insort(top, new)
+            del top[self.top_k:]
+
+    def add(self, key, label, popularity=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if popularity is None:
+                popularity = entry[1] if entry else 0
+            old = self._rank(key, entry[0], entry[1]) if entry else None
+            new = self._rank(key, label, popularity)
+            tokens = tuple(set(tokenize(label)))
+            self.entries[key] = (label, popularity, tokens)
+
+            new_nodes = self._path(tokens, create=True)
+            if entry:
+                for node_id, node in self._path(entry[2]).items():
+                    if node_id not in new_nodes:
+                        node.keys.discard(key)
+                        self._place(node, old, None)
+            for node in new_nodes.values():
+                node.keys.add(key)
+                self._place(node, old, new)
+
+    def remove(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return
+            old = self._rank(key, entry[0], entry[1])
+            for node in self._path(entry[2]).values():
+                node.keys.discard(key)
+                self._place(node, old, None)
+
+    def adjust_popularity(self, key, delta):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.add(key, entry[0], max(entry[1] + delta, 0))
+
+    def _ranked(self, node):
+        """The best ``top_k`` keys under ``node``, best first."""
+        if node.stale:
+            entries = self.entries
+            node.top = heapq.nsmallest(
+                self.top_k, (self._rank(key, *entries[key][:2]) for key in node.keys)
+            )
+            node.stale = False
+        return [rank[2] for rank in node.top]
+
+    def _ranked_all(self, node):
+        entries = self.entries
+        return sorted(node.keys, key=lambda key: self._rank(key, *entries[key][:2]))
+
+    def search(self, query, limit=8):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self.lock:
+            nodes = [self._node(token) for token in tokens]
+            if not all(nodes):
+                return []
+
+            # Walk the most selective token's ranking and keep entries matching every other token
+            nodes.sort(key=lambda node: len(node.keys))
+            others = [node.keys for node in nodes[1:]]
+
+            def matches(ranking):
+                keys = []
+                for key in ranking:
+                    if all(key in other for other in others):
+                        keys.append(key)
+                        if len(keys) >= limit:
+                            break
+                return keys
+
+            keys = matches(self._ranked(nodes[0]))
+            if len(keys) < limit and len(nodes[0].keys) > len(nodes[0].top):
+                # Rare: the other tokens filtered out most of the bounded ranking
+                keys = matches(self._ranked_all(nodes[0]))
+
+            return [
+                {"id": key[1], "label": self.entries[key][0], "type": key[0]}
+                for key in keys
+            ]
+
+
+class AutocompleteIndex:
+    """
+    Process-local autocomplete over product, tag and category names.
+
+    The first lookup builds the index from the database. Afterwards it is kept current
+    by the signals in core.signals (once the write commits), and refreshed in a
+    background thread every AUTOCOMPLETE_REFRESH_SECONDS to pick up writes made by
+    other workers, so lookups never wait on the database once the index exists.
+    Updates arriving while a rebuild reads the database are applied to the live index
+    and replayed on the new one before it is swapped in.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.built_at = 0
+        self.refreshing = False
+        self.pending = None  # updates to replay on the index being built
+        self.lock = threading.RLock()
+
+    def build(self):
+        with self.lock:
+            self.pending = []
+        try:
+            index = PrefixIndex()
+
+            order_counts = dict(
+                OrderItem.objects.values_list('product_id').annotate(count=Count('id')).values_list('product_id', 'count')
+            )
+            for pk, name in Product.objects.filter(is_active=True).values_list('pk', 'name'):
+                index.add(('product', pk), name, order_counts.get(pk, 0))
+
+            active_products = Count('products', filter=Q(products__is_active=True))
+            for model, kind in ((Tag, 'tag'), (Category, 'category')):
+                for pk, name, count in model.objects.annotate(count=active_products).values_list('pk', 'name', 'count'):
+                    index.add((kind, pk), name, count)
+
+            with self.lock:
+                # An update committed just before the reads above is counted twice; popularity
+                # is off by that much until the next rebuild
+                for operation, args in self.pending:
+                    getattr(index, operation)(*args)
+                self.index = index
+                self.built_at = time.monotonic()
+        finally:
+            with self.lock:
+                self.pending = None
+        logger.info(f"Autocomplete index built with {len(index)} entries")
+
+    def _refresh(self):
+        try:
+            self.build()
+        except Exception as e:
+            logger.error(f"Autocomplete index refresh failed: {str(e)}")
+        finally:
+            self.refreshing = False
+            connection.close()  # the refresh thread has its own connection
+
+    def search(self, query, limit=8):
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.build()
+        elif time.monotonic() - self.built_at > settings.AUTOCOMPLETE_REFRESH_SECONDS and not self.refreshing:
+            self.refreshing = True
+            threading.Thread(target=self._refresh, daemon=True).start()
+        return self.index.search(query, limit)
+
+    # Incremental updates, called from core.signals after commit. No-ops until the index is built.
+
+    def _update(self, operation, *args):
+        with self.lock:
+            if self.index is not None:
+                getattr(self.index, operation)(*args)
+            if self.pending is not None:
+                self.pending.append((operation, args))
+
+    def add(self, kind, pk, label, popularity=None):
+        self._update('add', (kind, pk), label, popularity)
+
+    def remove(self, kind, pk):
+        self._update('remove', (kind, pk))
+
+    def adjust_popularity(self, kind, pk, delta):
+        self._update('adjust_popularity', (kind, pk), delta)
+
+
+autocomplete_index = AutocompleteIndex()
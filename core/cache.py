@@ -0,0 +1,262 @@
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+from django_redis import get_redis_connection
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import LockError, RedisError
+from rest_framework.response import Response
+
+logger = logging.getLogger('core')
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_MODIFIED_KEY = 'catalog:modified'  # when the version was last bumped (Last-Modified of catalog responses)
+STOCK_VERSION_KEY = 'catalog:stock_version'  # bumped by stock changes that leave every list's contents alone
+
+# What a Redis outage raises through django-redis (cache API) and redis-py (locks);
+# catalog reads then skip the cache
+CACHE_ERRORS = (ConnectionInterrupted, RedisError, ConnectionError)
+
+# Like django.core.cache.cache, for the CATALOG_CACHE_ALIAS (the two-tier cache by default)
+catalog_cache = ConnectionProxy(caches, settings.CATALOG_CACHE_ALIAS)
+
+
+def _counter(key):
+    version = catalog_cache.get(key)
+    if version is None:
+        # Seeded from the clock so a lost key never brings back an older namespace
+        catalog_cache.add(key, int(time.time()), timeout=None)
+        version = catalog_cache.get(key)
+    return version
+
+
+def _bump(key):
+    catalog_cache.set(CATALOG_MODIFIED_KEY, timezone.now().replace(microsecond=0), timeout=None)
+    try:
+        return catalog_cache.incr(key)
+    except ValueError:
+        _counter(key)
+        return catalog_cache.incr(key)
+
+
+def get_catalog_version():
+    """Raises one of CACHE_ERRORS when Redis is unreachable; callers then serve uncached."""
+    return _counter(CATALOG_VERSION_KEY)
+
+
+def get_stock_version():
+    return _counter(STOCK_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Retire every cached catalog response at once: keys of the old version are simply never read again."""
+    try:
+        return _bump(CATALOG_VERSION_KEY)
+    except CACHE_ERRORS as e:
+        # Cached responses expire on their own; nothing else to do without Redis
+        logger.error(f"Catalog version bump failed: {str(e)}")
+
+
+def bump_stock_version():
+    """
+    Stock counts changed, but not which products are in stock: cached lists stay valid and
+    are refreshed in place (see ``get_or_compute``'s ``stamp``), while ETags and
+    Last-Modified move on so conditional GETs never keep an old count.
+    """
+    try:
+        return _bump(STOCK_VERSION_KEY)
+    except CACHE_ERRORS as e:
+        logger.error(f"Stock version bump failed: {str(e)}")
+
+
+def catalog_namespace():
+    return f'catalog:v{get_catalog_version()}'
+
+
+class CacheMetrics:
+    """
+    In-process counters per cache name (reset on restart, summed per worker).
+
+    Outcomes: ``hit``, ``miss``, ``stale`` (expired value served while another worker
+    recomputes), ``early_refresh`` (recomputed ahead of expiry) and ``stampede_avoided``
+    (a recompute skipped because another worker held the lock).
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, name, outcome):
+        with self.lock:
+            self.counts[(name, outcome)] += 1
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+        result = {}
+        for (name, outcome), count in sorted(counts.items()):
+            result.setdefault(name, {})[outcome] = count
+        for outcomes in result.values():
+            served = outcomes.get('hit', 0) + outcomes.get('stale', 0)
+            lookups = served + outcomes.get('miss', 0) + outcomes.get('early_refresh', 0)
+            outcomes['hit_rate'] = round(served / lookups, 3) if lookups else None
+        return result
+
+
+cache_metrics = CacheMetrics()
+
+
+# ----- stampede protection -----
+
+def cache_entry(value, timeout, compute_time=0.0, stamp=None):
+    """
+    Envelope stored by ``get_or_compute``: the value, its logical expiry, how long it
+    took to compute and the ``stamp`` it was computed under.
+    """
+    return {'value': value, 'expires': time.time() + timeout, 'delta': compute_time, 'stamp': stamp}
+
+
+def entry_timeout(timeout):
+    # Entries outlive their logical expiry by CACHE_STALE_SECONDS so they can be served stale
+    return timeout + settings.CACHE_STALE_SECONDS
+
+
+def should_refresh(entry):
+    """
+    Probabilistic early expiration (XFetch): the closer to expiry and the slower the
+    value is to compute, the likelier a reader volunteers to refresh it early, so a
+    hot key is usually recomputed once, before it expires.
+    """
+    jitter = entry['delta'] * settings.CACHE_XFETCH_BETA * -math.log(1.0 - random.random())
+    return time.time() + jitter >= entry['expires']
+
+
+@contextmanager
+def single_flight(name):
+    """
+    Non-blocking Redis lock around a recompute: yields True to the one worker that
+    should do it and False to everyone else. The lock expires after
+    CACHE_LOCK_TIMEOUT seconds if its holder dies. Without Redis every caller leads.
+    """
+    try:
+        lock = get_redis_connection('default').lock(f'lock:{name}', timeout=settings.CACHE_LOCK_TIMEOUT, blocking=False)
+        acquired = lock.acquire()
+    except CACHE_ERRORS as e:
+        logger.warning(f"Lock '{name}' unavailable, computing without it: {str(e)}")
+        yield True
+        return
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except (LockError, *CACHE_ERRORS):
+                pass  # expired while computing (someone else may hold it now), or Redis went away
+
+
+def get_or_compute(key, compute, timeout, name, stamp=None):
+    """
+    Return ``(value, outcome)`` for ``key``, computing it on a miss.
+
+    Only the worker holding the key's lock recomputes. Others serve the expired value
+    while it is refreshed, or, on a cold miss, wait up to CACHE_LOCK_WAIT seconds
+    for it to appear. An entry computed under another ``stamp`` is refreshed the same
+    way as an expired one. ``None`` results are returned but not cached. Outcomes are
+    recorded in ``cache_metrics`` under ``name``; ``bypass`` means Redis was unreachable
+    and the value was computed uncached.
+    """
+    try:
+        entry = catalog_cache.get(key)
+    except CACHE_ERRORS as e:
+        logger.warning(f"Cache unavailable for '{key}', computing uncached: {str(e)}")
+        cache_metrics.record(name, 'bypass')
+        return compute(), 'bypass'
+    if entry is not None and entry.get('stamp') == stamp and not should_refresh(entry):
+        cache_metrics.record(name, 'hit')
+        return entry['value'], 'hit'
+
+    with single_flight(key) as leader:
+        if not leader:
+            if entry is not None:
+                cache_metrics.record(name, 'stampede_avoided')
+                cache_metrics.record(name, 'stale')
+                return entry['value'], 'stale'
+            deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                try:
+                    entry = catalog_cache.get(key)
+                except CACHE_ERRORS:
+                    break
+                if entry is not None:
+                    cache_metrics.record(name, 'stampede_avoided')
+                    cache_metrics.record(name, 'hit')
+                    return entry['value'], 'hit'
+            else:
+                logger.warning(f"Gave up waiting for '{key}' to be recomputed by another worker")
+
+        started = time.monotonic()
+        value = compute()
+        if value is not None:
+            entry_value = cache_entry(value, timeout, time.monotonic() - started, stamp)
+            try:
+                catalog_cache.set(key, entry_value, timeout=entry_timeout(timeout))
+            except CACHE_ERRORS as e:
+                logger.warning(f"Could not cache '{key}': {str(e)}")
+
+    outcome = 'miss' if entry is None else 'early_refresh'
+    cache_metrics.record(name, outcome)
+    return value, outcome
+
+
+class CachedListMixin:
+    """
+    Caches ``list`` response data for ``list_cache_timeout`` seconds, through
+    ``get_or_compute`` (single-flight, early refresh, stale serving).
+
+    The key is the catalog namespace (``catalog:v<N>``, bumped by core.signals on
+    catalog writes), the viewset, the anonymous/authenticated scope and a hash of the
+    normalized query string, so filter/search/ordering/page variants are cached
+    separately and a single version bump retires them all. Without Redis, lists are
+    served uncached.
+    """
+
+    list_cache_timeout = None  # seconds; None disables the cache
+
+    def list_cache_key(self, request):
+        params = sorted((key, request.query_params.getlist(key)) for key in request.query_params)
+        payload = json.dumps([request.get_host(), request.path, params])
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        scope = 'auth' if request.user.is_authenticated else 'anon'
+        return f'{catalog_namespace()}:list:{self.basename}:{scope}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        if not self.list_cache_timeout:
+            return super().list(request, *args, **kwargs)
+        try:
+            key, stamp = self.list_cache_key(request), get_stock_version()
+        except CACHE_ERRORS as e:
+            logger.warning(f"Catalog cache unavailable, listing {self.basename} uncached: {str(e)}")
+            return super().list(request, *args, **kwargs)
+
+        # Error statuses are raised as exceptions by DRF, so whatever comes back is cacheable.
+        # Lists show stock counts: a stock-only change refreshes them (single-flight) instead of retiring them
+        data, outcome = get_or_compute(
+            key,
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs).data,
+            self.list_cache_timeout,
+            self.basename,
+            stamp=stamp,
+        )
+        return Response(data, headers={'X-Cache': outcome.upper()})
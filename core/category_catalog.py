@@ -0,0 +1,41 @@
+import logging
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .cache import CACHE_ERRORS, catalog_namespace, get_or_compute
+from .models import Category
+from .serializers import CategorySerializer
+
+logger = logging.getLogger('core')
+
+
+def build_category_catalog():
+    """Every category, serialized, with its number of active in-stock products; one grouped query."""
+    in_stock = Count('products', filter=Q(products__is_active=True, products__stock__gt=0))
+    categories = Category.objects.annotate(product_count=in_stock).order_by('name')
+    return [
+        dict(CategorySerializer(category).data, product_count=category.product_count)
+        for category in categories
+    ]
+
+
+def get_category_catalog():
+    """
+    The cached category catalog. It lives under the catalog namespace, so Category
+    saves/deletes, Product.categories changes and products going in or out of stock or
+    visibility (all of which bump ``catalog:v<N>`` in core.signals) retire it. Rebuilds are
+    single-flight: other workers keep serving the previous catalog meanwhile. Without
+    Redis it is built per request.
+    """
+    try:
+        key = f'{catalog_namespace()}:categories'
+    except CACHE_ERRORS as e:
+        logger.warning(f"Catalog cache unavailable, building the category catalog uncached: {str(e)}")
+        return build_category_catalog()
+    catalog, _ = get_or_compute(key, build_category_catalog, settings.CATEGORY_CATALOG_TIMEOUT, 'categories')
+    return catalog
+
+
+def get_category_product_counts():
+    return {category['id']: category['product_count'] for category in get_category_catalog()}
@@ -0,0 +1,219 @@
+import threading
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.fields import ReadOnlyField, SkipField, empty
+from rest_framework.relations import ManyRelatedField, PKOnlyObject, PrimaryKeyRelatedField
+
+from .sparse_fields import SparseFieldsSerializerMixin
+
+# How a plan entry produces its value
+ATTRIBUTE = 0  # precomputed getter, then the field's formatter (skipped for None)
+METHOD = 1     # SerializerMethodField: the unbound get_<name> called with the serializer
+NESTED = 2     # nested serializer: precomputed getter, then the nested serializer instance
+DRF = 3        # anything else: DRF's own get_attribute/to_representation
+
+
+def _instance_getter(model, name):
+    """Getter for a model attribute; methods are called, like DRF does for callable sources."""
+    if callable(getattr(model, name)):
+        return lambda instance: getattr(instance, name)()
+    return attrgetter(name)
+
+
+def _related_getter(model, name):
+    """
+    Getter for a to-many relation: the prefetched rows when ``prefetch_related`` loaded
+    them, without building a related manager per row; otherwise ``.all()``.
+    """
+    try:
+        model_field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return attrgetter(name)
+    if not (model_field.many_to_many or model_field.one_to_many):
+        return attrgetter(name)
+
+    def get(instance):
+        try:
+            return instance._prefetched_objects_cache[name]
+        except (AttributeError, KeyError):
+            return getattr(instance, name).all()
+    return get
+
+
+def _pk_list_getter(model, name):
+    related = _related_getter(model, name)
+
+    def get(instance):
+        if instance.pk is None:
+            return []
+        return [obj.pk for obj in related(instance)]
+    return get
+
+
+def _compile_entry(serializer_class, model, name, field):
+    """``(name, kind, getter, formatter)`` for one readable field."""
+    if isinstance(field, serializers.SerializerMethodField):
+        return name, METHOD, getattr(serializer_class, field.method_name), None
+
+    source_attrs = field.source_attrs
+    # Dotted or '*' sources, defaults and attributes the model class does not define (annotations,
+    # fields DRF would skip) keep DRF's lookup and its missing-attribute handling
+    simple = (
+        model is not None
+        and len(source_attrs) == 1
+        and field.default is empty
+        and hasattr(model, source_attrs[0])
+    )
+    if not simple:
+        return name, DRF, None, None
+    attr = source_attrs[0]
+
+    if isinstance(field, serializers.BaseSerializer):
+        return name, NESTED, _related_getter(model, attr), None
+    if isinstance(field, ManyRelatedField):
+        if isinstance(field.child_relation, PrimaryKeyRelatedField) and field.child_relation.pk_field is None:
+            return name, ATTRIBUTE, _pk_list_getter(model, attr), None
+        return name, DRF, None, None
+    if isinstance(field, PrimaryKeyRelatedField):
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return name, DRF, None, None
+        if field.pk_field is None and model_field.many_to_one:
+            return name, ATTRIBUTE, attrgetter(model_field.attname), None
+        return name, DRF, None, None
+    if isinstance(field, serializers.RelatedField):
+        return name, DRF, None, None
+
+    formatter = None if type(field) is ReadOnlyField else field.to_representation
+    return name, ATTRIBUTE, _instance_getter(model, attr), formatter
+
+
+def compile_plan(serializer_class, fields=None):
+    """
+    Build the representation function of ``serializer_class`` from a context-free prototype
+    (or from ``fields``, the fields of a serializer trimmed by ``?fields=``/``?expand=``).
+
+    The readable fields are resolved once into ``(name, kind, getter, formatter)``
+    entries, so a row is represented by walking a flat tuple instead of DRF's per-row
+    field iteration, ``get_attribute`` and PKOnlyObject handling. Formatters of plain
+    fields are bound to the prototype; method and nested fields are resolved against
+    the live serializer, so its context (request, ...) is honoured.
+    """
+    if fields is None:
+        fields = serializer_class().fields
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    entries = tuple(
+        _compile_entry(serializer_class, model, name, field)
+        for name, field in fields.items()
+        if not field.write_only
+    )
+
+    def represent(serializer, instance):
+        data = {}
+        fields = None
+        for name, kind, get, formatter in entries:
+            if kind == ATTRIBUTE:
+                value = get(instance)
+                data[name] = formatter(value) if formatter is not None and value is not None else value
+            elif kind == METHOD:
+                data[name] = get(serializer, instance)
+            else:
+                if fields is None:
+                    fields = serializer.fields
+                field = fields[name]
+                if kind == NESTED:
+                    value = get(instance)
+                    data[name] = None if value is None else field.to_representation(value)
+                    continue
+                try:
+                    value = field.get_attribute(instance)
+                except SkipField:
+                    continue
+                check = value.pk if isinstance(value, PKOnlyObject) else value
+                data[name] = None if check is None else field.to_representation(value)
+        return data
+
+    represent.entries = entries
+    return represent
+
+
+class SerializerCompiler:
+    """
+    Representation functions per serializer class, compiled on first use (all core
+    serializers are compiled at startup by CoreConfig). ``enabled = False`` makes every
+    compiled serializer use DRF's own ``to_representation`` (see benchmark_serializers).
+
+    Serializers trimmed by a field selection get a plan per (class, selection); since
+    selections come from query strings, at most ``max_trimmed_plans`` of those are kept.
+    """
+
+    def __init__(self, max_trimmed_plans=256):
+        self.plans = {}
+        self.trimmed_plans = {}
+        self.max_trimmed_plans = max_trimmed_plans
+        self.enabled = True
+        self.lock = threading.Lock()
+
+    def plan(self, serializer_class):
+        try:
+            return self.plans[serializer_class]
+        except KeyError:
+            with self.lock:
+                if serializer_class not in self.plans:
+                    self.plans[serializer_class] = compile_plan(serializer_class)
+                return self.plans[serializer_class]
+
+    def plan_for(self, serializer):
+        """The plan matching the fields of ``serializer`` instance."""
+        serializer.fields  # trims the fields, setting is_trimmed
+        if not serializer.is_trimmed:
+            return self.plan(type(serializer))
+        selection = serializer.field_selection
+        key = (type(serializer), selection.key)
+        plan = self.trimmed_plans.get(key)
+        if plan is None:
+            # Compiled from a copy whose context holds only the selection, so cached plans keep no request alive
+            prototype = type(serializer)(context={'field_selection': selection})
+            plan = compile_plan(type(serializer), prototype.fields)
+            with self.lock:
+                if len(self.trimmed_plans) < self.max_trimmed_plans:
+                    self.trimmed_plans[key] = plan
+        return plan
+
+    def compile_all(self, serializer_classes):
+        for serializer_class in serializer_classes:
+            self.plan(serializer_class)
+
+    def stats(self):
+        return {
+            serializer_class.__name__: {
+                'fields': len(plan.entries),
+                'drf_fallback': [name for name, kind, _, _ in plan.entries if kind == DRF],
+            }
+            for serializer_class, plan in self.plans.items()
+        }
+
+
+serializer_compiler = SerializerCompiler()
+
+
+class CompiledModelSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """
+    ModelSerializer whose output comes from the compiled plan of its class (or of its
+    field selection, see core.sparse_fields). Only ``to_representation`` changes:
+    validation, ``create`` and ``update`` stay DRF's, and subclasses can still
+    post-process ``super().to_representation()``.
+    """
+
+    @cached_property
+    def compiled_representation(self):
+        return serializer_compiler.plan_for(self)
+
+    def to_representation(self, instance):
+        if not serializer_compiler.enabled:
+            return super().to_representation(instance)
+        return self.compiled_representation(self, instance)
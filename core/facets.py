@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+from bisect import bisect_right
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef
+
+from .cache import CACHE_ERRORS, catalog_cache, catalog_namespace
+from .models import Product, Category, Tag
+
+logger = logging.getLogger('core')
+
+FACET_FLAGS = ("is_new", "is_sale", "is_featured", "is_trending")
+# Query params that change the page, not the filtered set
+NON_FILTER_PARAMS = {"page", "page_size", "cursor", "ordering", "facets"}
+
+
+def facets_cache_key(query_params):
+    params = sorted(
+        (key, sorted(query_params.getlist(key)))
+        for key in query_params
+        if key not in NON_FILTER_PARAMS
+    )
+    digest = hashlib.sha1(json.dumps(params).encode('utf-8')).hexdigest()
+    return f"{catalog_namespace()}:product_facets:{digest}"
+
+
+def _linked_ids(through, column):
+    return ArraySubquery(through.objects.filter(product_id=OuterRef('pk')).values(column))
+
+
+def compute_facets(queryset):
+    """
+    Facet counts for a filtered product queryset.
+
+    One query returns, per matching product, its price, stock flags and linked category
+    and tag ids (as arrays, so there is no join fan-out); the counts are then a single
+    Python pass over those rows.
+    """
+    rows = (
+        Product.objects.filter(pk__in=queryset.order_by().values('pk'))
+        .order_by()
+        .annotate(
+            category_id_list=_linked_ids(Product.categories.through, 'category_id'),
+            tag_id_list=_linked_ids(Product.tags.through, 'tag_id'),
+        )
+        .values_list('price', 'stock', 'is_active', *FACET_FLAGS, 'category_id_list', 'tag_id_list')
+    )
+
+    boundaries = settings.FACET_PRICE_BUCKETS
+    total = in_stock = 0
+    flags = Counter()
+    categories = Counter()
+    tags = Counter()
+    prices = [0] * len(boundaries)
+    for price, stock, is_active, *flag_values, category_ids, tag_ids in rows:
+        total += 1
+        if stock > 0 and is_active:
+            in_stock += 1
+        for flag, value in zip(FACET_FLAGS, flag_values):
+            if value:
+                flags[flag] += 1
+        categories.update(category_ids)
+        tags.update(tag_ids)
+        prices[max(bisect_right(boundaries, price) - 1, 0)] += 1
+
+    category_labels = Category.objects.filter(pk__in=categories).values('id', 'name', 'slug')
+    tag_labels = Tag.objects.filter(pk__in=tags).values('id', 'name')
+    return {
+        "total": total,
+        "in_stock": in_stock,
+        "flags": {flag: flags[flag] for flag in FACET_FLAGS},
+        "categories": sorted(
+            ({**label, "count": categories[label["id"]]} for label in category_labels),
+            key=lambda facet: (-facet["count"], facet["name"]),
+        ),
+        "tags": sorted(
+            ({**label, "count": tags[label["id"]]} for label in tag_labels),
+            key=lambda facet: (-facet["count"], facet["name"]),
+        ),
+        "price": [
+            {
+                "min": boundaries[i],
+                "max": boundaries[i + 1] if i + 1 < len(boundaries) else None,
+                "count": count,
+            }
+            for i, count in enumerate(prices)
+        ],
+    }
+
+
+def get_facets(queryset, query_params):
+    """Facets for the filtered queryset, cached per filter combination (computed uncached without Redis)."""
+    try:
+        cache_key = facets_cache_key(query_params)
+        facets = catalog_cache.get(cache_key)
+    except CACHE_ERRORS as e:
+        logger.warning(f"Catalog cache unavailable, computing facets uncached: {str(e)}")
+        return compute_facets(queryset)
+    if facets is None:
+        facets = compute_facets(queryset)
+        try:
+            catalog_cache.set(cache_key, facets, timeout=settings.FACET_CACHE_TIMEOUT)
+        except CACHE_ERRORS as e:
+            logger.warning(f"Could not cache facets: {str(e)}")
+    return facets
@@ -1,15 +1,28 @@
 import django_filters
-from django.db.models import Q
+from rest_framework import filters
 
 from .models import Product
+from .search import search_products
 
 
 class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
     pass
 
 
+class ProductSearchFilter(filters.SearchFilter):
+    """SearchFilter backed by the product full-text search vector instead of icontains joins."""
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        return search_products(queryset, " ".join(search_terms))
+
+
 class ProductFilter(django_filters.FilterSet):
-    category_id = NumberInFilter(field_name='categories__id', lookup_expr='in')
+    category_id = NumberInFilter(method='filter_category_id')
+    tag_id = NumberInFilter(method='filter_tag_id')  # any of the tags
+    tag_id_all = NumberInFilter(method='filter_tag_id_all')  # every one of the tags
     price_min = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
     price_max = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
     in_stock = django_filters.BooleanFilter(method='filter_in_stock')
@@ -31,22 +44,29 @@ class ProductFilter(django_filters.FilterSet):
         )
     )
 
+    def filter_category_id(self, queryset, name, value):
+        return queryset.in_categories(value) if value else queryset
+
+    def filter_tag_id(self, queryset, name, value):
+        return queryset.with_tags(value) if value else queryset
+
+    def filter_tag_id_all(self, queryset, name, value):
+        return queryset.with_all_tags(value) if value else queryset
+
     def filter_in_stock(self, queryset, name, value):
         if value:
             return queryset.filter(stock__gt=0, is_active=True)
         return queryset
 
     def filter_search(self, queryset, name, value):
-        return queryset.filter(
-            Q(name__icontains=value) |
-            Q(description__icontains=value) |
-            Q(tags__name__icontains=value)
-        ).distinct()
+        return search_products(queryset, value)
 
     class Meta:
         model = Product
         fields = [
             "category_id",
+            "tag_id",
+            "tag_id_all",
             "price_min",
             "price_max",
             "in_stock",
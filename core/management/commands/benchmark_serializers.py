@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.compiled_serializers import serializer_compiler
+from core.models import Category, Order, OrderItem, Product, ProductImage, ShippingAddress, Tag, User
+from core.serializers import (CategorySerializer, OrderItemSerializer, OrderSerializer, ProductDetailSerializer,
+                              ProductImageSerializer, ProductListSerializer, ProductSerializer,
+                              ShippingAddressSerializer, TagSerializer, UserSerializer)
+
+# Each serializer with the queryset its views use, so relation loading is excluded from the timings
+BENCHMARKS = (
+    (TagSerializer, lambda: Tag.objects.all()),
+    (CategorySerializer, lambda: Category.objects.all()),
+    (ProductImageSerializer, lambda: ProductImage.objects.all()),
+    (ShippingAddressSerializer, lambda: ShippingAddress.objects.all()),
+    (UserSerializer, lambda: User.objects.all()),
+    (ProductListSerializer, lambda: Product.objects.prefetch_related('categories', 'tags')),
+    (ProductDetailSerializer, lambda: Product.objects.prefetch_related('categories', 'tags', 'images')),
+    (ProductSerializer, lambda: Product.objects.prefetch_related('tags', 'images')),
+    (OrderItemSerializer, lambda: OrderItem.objects.select_related('product').prefetch_related(
+        'product__tags', 'product__images')),
+    (OrderSerializer, lambda: Order.objects.select_related('shipping_address').prefetch_related(
+        'items__product__tags', 'items__product__images')),
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-row cost of DRF and compiled to_representation for the core read serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200, help='Rows loaded per serializer (default: 200)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path; the best is kept (default: 5)')
+
+    def best_time(self, serializer_class, rows, repeat, compiled):
+        serializer_compiler.enabled = compiled
+        try:
+            best, data = None, None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                data = serializer_class(rows, many=True).data
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            return best, data
+        finally:
+            serializer_compiler.enabled = True
+
+    def handle(self, *args, **options):
+        header = ('serializer', 'rows', 'drf us/row', 'compiled us/row', 'speedup', 'same output')
+        lines = [header]
+        for serializer_class, queryset in BENCHMARKS:
+            rows = list(queryset()[:options['rows']])
+            if not rows:
+                lines.append((serializer_class.__name__, '0', '-', '-', '-', '-'))
+                continue
+            drf, drf_data = self.best_time(serializer_class, rows, options['repeat'], compiled=False)
+            compiled, compiled_data = self.best_time(serializer_class, rows, options['repeat'], compiled=True)
+            lines.append((
+                serializer_class.__name__,
+                str(len(rows)),
+                f'{drf / len(rows) * 1e6:.1f}',
+                f'{compiled / len(rows) * 1e6:.1f}',
+                f'{drf / compiled:.2f}x',
+                'yes' if drf_data == compiled_data else 'NO',
+            ))
+
+        widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+        for number, line in enumerate(lines):
+            text = '  '.join(value.ljust(width) for value, width in zip(line, widths))
+            self.stdout.write(self.style.MIGRATE_HEADING(text) if number == 0 else text)
+
+        mismatched = [line[0] for line in lines[1:] if line[5] == 'NO']
+        if mismatched:
+            self.stdout.write(self.style.ERROR(f'Compiled output differs from DRF for: {", ".join(mismatched)}'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Compare Product.category_ids/tag_ids with the M2M through tables and repair drifted products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products checked per query (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it (exits non-zero on drift)')
+
+    def batches(self, batch_size):
+        """Consecutive pk ranges of ``batch_size`` products, read one range at a time."""
+        last = None
+        while True:
+            products = Product.objects.order_by('pk')
+            if last is not None:
+                products = products.filter(pk__gt=last)
+            ids = list(products.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return
+            last = ids[-1]
+            yield Product.objects.filter(pk__gte=ids[0], pk__lte=last).order_by(), len(ids)
+
+    def handle(self, *args, **options):
+        checked, drifted = 0, []
+        for batch, size in self.batches(options['batch_size']):
+            batch_drift = list(batch.relation_array_drift().values_list('pk', flat=True))
+            if batch_drift and not options['dry_run']:
+                Product.objects.filter(pk__in=batch_drift).sync_relation_arrays()
+            checked += size
+            drifted += batch_drift
+            self.stdout.write(f'{checked} products checked, {len(drifted)} drifted')
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('category_ids/tag_ids match the through tables'))
+        elif options['dry_run']:
+            shown = ', '.join(map(str, drifted[:20])) + (', ...' if len(drifted) > 20 else '')
+            raise CommandError(f'{len(drifted)} products drifted: {shown}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(drifted)} products'))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+INDEX_USAGE_SQL = """
+    SELECT s.relname, s.indexrelname, s.idx_scan, s.idx_tup_read, s.idx_tup_fetch,
+           pg_relation_size(s.indexrelid), i.indisunique OR i.indisprimary
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.relname LIKE %s
+    ORDER BY s.idx_scan, pg_relation_size(s.indexrelid) DESC
+"""
+
+
+def human_size(size):
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TB'
+
+
+class Command(BaseCommand):
+    help = 'Report index usage from pg_stat_user_indexes (scans since the last stats reset)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', default='core_%', help='Table name or LIKE pattern (default: core_%%)')
+        parser.add_argument('--unused', action='store_true', help='Only list indexes that have never been scanned')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('index_usage needs PostgreSQL statistics views')
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()')
+            stats_reset = cursor.fetchone()[0]
+            cursor.execute(INDEX_USAGE_SQL, [options['table']])
+            rows = cursor.fetchall()
+
+        if options['unused']:
+            rows = [row for row in rows if row[2] == 0]
+
+        self.stdout.write(f'Statistics collected since: {stats_reset or "cluster start"}')
+        header = ('table', 'index', 'scans', 'tuples read', 'tuples fetched', 'size')
+        lines = [header] + [
+            (table, index, str(scans), str(read), str(fetched), human_size(size))
+            for table, index, scans, read, fetched, size, _ in rows
+        ]
+        widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+        for number, line in enumerate(lines):
+            text = '  '.join(value.ljust(width) for value, width in zip(line, widths))
+            self.stdout.write(self.style.MIGRATE_HEADING(text) if number == 0 else text)
+
+        # Unique/primary indexes enforce constraints, so zero scans is not a reason to drop them
+        unused = [row[1] for row in rows if row[2] == 0 and not row[6]]
+        if unused:
+            self.stdout.write(self.style.WARNING(f'{len(unused)} non-unique index(es) never scanned: {", ".join(unused)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Every non-unique index has been scanned'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.merchandising import COLLECTIONS, rebuild_collection
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the featured/trending/new/sale Redis sorted sets from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('collections', nargs='*', help=f'Collections to rebuild (default: all of {", ".join(COLLECTIONS)})')
+
+    def handle(self, *args, **options):
+        names = options['collections'] or list(COLLECTIONS)
+        unknown = set(names) - set(COLLECTIONS)
+        if unknown:
+            raise CommandError(f'Unknown collection(s): {", ".join(sorted(unknown))}')
+
+        for name in names:
+            count = rebuild_collection(name)
+            self.stdout.write(self.style.SUCCESS(f'{name}: {count} products'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Product
+from core.product_rows import outdated_cards, update_product_cards
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored list representation (Product.card) of every product, or only outdated ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Products per UPDATE (default: 500)')
+        parser.add_argument('--missing', action='store_true',
+                            help='Only build cards that are NULL or of an older CARD_VERSION')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        products = Product.objects.order_by('pk')
+        if options['missing']:
+            products = outdated_cards(products)
+
+        # One pk range at a time, so neither the ids nor a long transaction span the table
+        updated, last = 0, None
+        while True:
+            batch = products if last is None else products.filter(pk__gt=last)
+            ids = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            last = ids[-1]
+            updated += update_product_cards(ids, batch_size=batch_size)
+            self.stdout.write(f'{updated} product cards rebuilt')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {updated} product cards'))
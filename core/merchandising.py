@@ -0,0 +1,125 @@
+import logging
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .cache import cache_metrics, single_flight
+from .models import Product
+
+logger = logging.getLogger('core')
+
+# Collection name -> Product flag
+COLLECTIONS = {
+    'featured': 'is_featured',
+    'trending': 'is_trending',
+    'new': 'is_new',
+    'sale': 'is_sale',
+}
+
+# Manually ranked products score above any updated_at timestamp: rank 1 first, then rank 2, ...
+RANKED_SCORE_BASE = 10 ** 12
+
+
+def collection_key(name):
+    return f'merchandising:{name}'
+
+
+def built_key(name):
+    # Redis drops empty sorted sets, so "built" is tracked separately from the set itself
+    return f'merchandising:{name}:built'
+
+
+def product_score(rank, updated_at):
+    if rank is not None:
+        return RANKED_SCORE_BASE - rank
+    return updated_at.timestamp()
+
+
+def rebuild_collection(name, redis=None):
+    """Replace a collection with the current SQL state; readers see the old or the new set, never a partial one."""
+    redis = redis or get_redis_connection('default')
+    rows = Product.objects.filter(**{COLLECTIONS[name]: True}).values_list('pk', 'merchandising_rank', 'updated_at')
+    members = {pk: product_score(rank, updated_at) for pk, rank, updated_at in rows}
+
+    pipe = redis.pipeline()  # MULTI/EXEC
+    pipe.delete(collection_key(name))
+    if members:
+        pipe.zadd(collection_key(name), members)
+    pipe.set(built_key(name), 1, ex=settings.MERCHANDISING_REBUILD_SECONDS)
+    pipe.execute()
+    logger.info(f"Merchandising collection '{name}' rebuilt with {len(members)} products")
+    return len(members)
+
+
+def sync_product(product):
+    """Add the product to the collections whose flag is set and drop it from the others."""
+    score = product_score(product.merchandising_rank, product.updated_at)
+    try:
+        pipe = get_redis_connection('default').pipeline()
+        for name, flag in COLLECTIONS.items():
+            if getattr(product, flag):
+                pipe.zadd(collection_key(name), {product.pk: score})
+            else:
+                pipe.zrem(collection_key(name), product.pk)
+        pipe.execute()
+    except RedisError as e:
+        # The periodic rebuild (MERCHANDISING_REBUILD_SECONDS) catches up
+        logger.error(f"Merchandising sync failed for product {product.pk}: {str(e)}")
+
+
+def remove_product(pk):
+    try:
+        pipe = get_redis_connection('default').pipeline()
+        for name in COLLECTIONS:
+            pipe.zrem(collection_key(name), pk)
+        pipe.execute()
+    except RedisError as e:
+        logger.error(f"Merchandising removal failed for product {pk}: {str(e)}")
+
+
+class MerchandisingCollection:
+    """
+    Product ids of one collection, best first, as a read-only sequence.
+
+    ``len()`` is a ZCARD and slicing a ZREVRANGE, so Django's paginator (and
+    DRF's page-number pagination) can page it without touching SQL. A missing
+    or expired set is rebuilt on first access, by a single worker.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.key = collection_key(name)
+        self.redis = get_redis_connection('default')
+        if not self.redis.exists(built_key(name)):
+            self.rebuild()
+
+    def rebuild(self):
+        # One worker rebuilds; the others keep paging the current set, or wait for the first build
+        with single_flight(built_key(self.name)) as leader:
+            if leader:
+                rebuild_collection(self.name, self.redis)
+                return
+            cache_metrics.record('merchandising', 'stampede_avoided')
+            deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+            while not self.redis.exists(self.key) and not self.redis.exists(built_key(self.name)):
+                if time.monotonic() >= deadline:
+                    rebuild_collection(self.name, self.redis)
+                    return
+                time.sleep(0.05)
+
+    def __len__(self):
+        return self.redis.zcard(self.key)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            ids = self.redis.zrevrange(self.key, index, index)
+            if not ids:
+                raise IndexError(index)
+            return int(ids[0])
+        start = index.start or 0
+        stop = -1 if index.stop is None else index.stop - 1
+        if index.stop is not None and stop < start:
+            return []
+        return [int(pk) for pk in self.redis.zrevrange(self.key, start, stop)]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.2 on 2026-10-16 20:57
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POPULATE_SEARCH_VECTOR = """
+    UPDATE core_product p SET search_vector =
+        setweight(to_tsvector('english', COALESCE(p.name, '')), 'A')
+        || setweight(to_tsvector('english',
+            COALESCE((SELECT string_agg(t.name, ' ')
+                      FROM core_tag t JOIN core_product_tags pt ON pt.tag_id = t.id
+                      WHERE pt.product_id = p.id), '')
+            || ' ' ||
+            COALESCE((SELECT string_agg(c.name, ' ')
+                      FROM core_category c JOIN core_product_categories pc ON pc.category_id = c.id
+                      WHERE pc.product_id = p.id), '')
+        ), 'B')
+        || setweight(to_tsvector('english', COALESCE(p.description, '')), 'C');
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_set_order_pk_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.RunSQL(POPULATE_SEARCH_VECTOR, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.2 on 2026-10-16 21:02
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0027_synonymgroup'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='appnotification',
+            index=models.Index(fields=['-created_at', 'id'], name='notification_keyset_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['-created_at', 'id'], name='order_created_keyset_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['-updated_at', 'id'], name='product_updated_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+# The auto-created through tables only get (product_id, <other>_id) via their unique
+# constraint; lookups from the category/tag side need the reverse composite.
+REVERSE_INDEXES = [
+    ('core_product_categories', 'product_categories_reverse_idx', 'category_id'),
+    ('core_product_tags', 'product_tags_reverse_idx', 'tag_id'),
+]
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0029_product_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" ("{column}", "product_id");',
+            reverse_sql=f'DROP INDEX CONCURRENTLY IF EXISTS "{name}";',
+        )
+        for table, name, column in REVERSE_INDEXES
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-16 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_through_table_reverse_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='merchandising_rank',
+            field=models.PositiveIntegerField(blank=True, help_text='Manual position in the featured/trending/new/sale collections (1 = first). Unranked products follow, most recently updated first.', null=True),
+        ),
+    ]
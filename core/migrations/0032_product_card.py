@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-16 22:40
+
+from django.db import migrations, models
+
+
+# No backfill here: existing products keep a NULL card, which core.product_rows computes on
+# read, until `manage.py rebuild_product_cards --missing` (batched) is run after deploying.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_product_merchandising_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='card',
+            field=models.JSONField(editable=False, null=True),
+        ),
+    ]
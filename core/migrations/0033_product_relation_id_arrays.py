@@ -0,0 +1,61 @@
+# Generated by Django 5.2.2 on 2026-10-16 22:30
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+BACKFILL_BATCH_SIZE = 5000
+
+POPULATE_RELATION_ARRAYS = """
+    UPDATE core_product p SET
+        category_ids = ARRAY(SELECT pc.category_id FROM core_product_categories pc
+                             WHERE pc.product_id = p.id ORDER BY pc.category_id),
+        tag_ids = ARRAY(SELECT pt.tag_id FROM core_product_tags pt
+                        WHERE pt.product_id = p.id ORDER BY pt.tag_id)
+    WHERE p.id >= %s AND p.id < %s;
+"""
+
+
+def populate_relation_arrays(apps, schema_editor):
+    # One short transaction per id range (the migration is not atomic), so the table is never locked as a whole
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT MIN(id), MAX(id) FROM core_product")
+        low, high = cursor.fetchone()
+        if low is None:
+            return
+        for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(POPULATE_RELATION_ARRAYS, [start, start + BACKFILL_BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    # Batched backfill and CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0032_product_card'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='category_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        # Populated before the indexes are built; check_relation_arrays repairs rows written meanwhile
+        migrations.RunPython(populate_relation_arrays, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['category_ids'], name='product_category_ids_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_ids'], name='product_tag_ids_idx'),
+        ),
+    ]
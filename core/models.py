@@ -1,5 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 from django.utils.text import slugify
@@ -30,10 +34,35 @@ class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='tag_name_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class SynonymGroup(models.Model):
+    """Names that refer to the same thing (common and scientific names) for search query expansion"""
+    terms = models.TextField(
+        help_text="Comma separated names, e.g. 'neon tetra, Paracheirodon innesi'"
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['terms']
+
+    def __str__(self):
+        return self.terms
+
+    def get_terms_list(self):
+        """Return the normalized terms as a list"""
+        return [' '.join(term.lower().split()) for term in self.terms.split(',') if term.strip()]
+
+
 class ShippingAddress(models.Model):
     """User shipping addresses - users can have multiple addresses"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shipping_addresses')
@@ -78,6 +107,9 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
+        indexes = [
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='category_name_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -88,6 +120,54 @@ class Category(models.Model):
         super().save(*args, **kwargs)
 
 
+class ProductQuerySet(models.QuerySet):
+    """
+    Category/tag filters as array predicates on the denormalized ``category_ids`` /
+    ``tag_ids`` columns (GIN indexed): ``&&`` for any of, ``@>`` for all of. They read
+    the product table alone, so no join, no duplicate rows and no DISTINCT.
+    """
+
+    def in_categories(self, category_ids):
+        """``category_ids`` may be ids or a ``values('pk')`` queryset."""
+        return self.filter(category_ids__overlap=category_ids)
+
+    def in_all_categories(self, category_ids):
+        return self.filter(category_ids__contains=list(category_ids))
+
+    def in_category(self, **lookups):
+        """e.g. ``in_category(slug__iexact=slug)`` or ``in_category(name=name)``"""
+        return self.in_categories(Category.objects.filter(**lookups).order_by().values('pk'))
+
+    def with_tags(self, tag_ids):
+        return self.filter(tag_ids__overlap=tag_ids)
+
+    def with_all_tags(self, tag_ids):
+        return self.filter(tag_ids__contains=list(tag_ids))
+
+    def linked_id_arrays(self):
+        """The ``category_ids``/``tag_ids`` values the M2M through tables say each product should have."""
+        through = {
+            'category_ids': (self.model.categories.through, 'category_id'),
+            'tag_ids': (self.model.tags.through, 'tag_id'),
+        }
+        return {
+            name: ArraySubquery(model.objects.filter(product_id=models.OuterRef('pk')).order_by(column).values(column))
+            for name, (model, column) in through.items()
+        }
+
+    def sync_relation_arrays(self):
+        """Rewrite ``category_ids``/``tag_ids`` from the through tables, in one UPDATE (no signals)."""
+        return self.update(**self.linked_id_arrays())
+
+    def relation_array_drift(self):
+        """Products whose ``category_ids`` or ``tag_ids`` disagree with the through tables."""
+        arrays = self.linked_id_arrays()
+        drift = models.Q()
+        for name in arrays:
+            drift |= ~models.Q(**{name: models.F(f'linked_{name}')})
+        return self.alias(**{f'linked_{name}': array for name, array in arrays.items()}).filter(drift)
+
+
 class Product(models.Model):
     """Product model with merchandising features"""
     name = models.TextField()
@@ -110,6 +190,11 @@ class Product(models.Model):
     is_sale = models.BooleanField(default=False)
     is_featured = models.BooleanField(default=False)
     is_trending = models.BooleanField(default=False)
+    merchandising_rank = models.PositiveIntegerField(
+        blank=True, null=True,
+        help_text="Manual position in the featured/trending/new/sale collections (1 = first). "
+                  "Unranked products follow, most recently updated first."
+    )
     stock = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -117,12 +202,45 @@ class Product(models.Model):
 
     tags = models.ManyToManyField('Tag', related_name='products', blank=True)
 
+    # Weighted full-text document kept current by core.signals (see core.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # List representation (ProductListSerializer output) kept current by core.signals (see core.product_rows)
+    card = models.JSONField(null=True, editable=False)
+    # Sorted ids of the linked categories/tags, kept in sync from m2m_changed by core.signals;
+    # filtered with array operators (see ProductQuerySet) instead of joining the through tables
+    category_ids = ArrayField(models.BigIntegerField(), default=list, blank=True, editable=False)
+    tag_ids = ArrayField(models.BigIntegerField(), default=list, blank=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='product_name_trgm_idx'),
+            GinIndex(fields=['category_ids'], name='product_category_ids_idx'),
+            GinIndex(fields=['tag_ids'], name='product_tag_ids_idx'),
+            models.Index(fields=['-updated_at', 'id'], name='product_updated_keyset_idx'),
+            # Collection endpoints: small partial indexes, one per merchandising flag
+            models.Index(fields=['-updated_at', 'id'], condition=models.Q(is_featured=True), name='product_featured_idx'),
+            models.Index(fields=['-updated_at', 'id'], condition=models.Q(is_trending=True), name='product_trending_idx'),
+            models.Index(fields=['-updated_at', 'id'], condition=models.Q(is_new=True), name='product_new_idx'),
+            models.Index(fields=['-updated_at', 'id'], condition=models.Q(is_sale=True), name='product_sale_idx'),
+            # ProductFilter: in_stock (is_active, stock > 0) and price_min/price_max
+            models.Index(fields=['is_active', 'stock', '-updated_at'], name='product_active_stock_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What was read, so core.signals can tell a stock-only save from a catalog change
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     @property
     def is_in_stock(self):
         """Check if product is available"""
@@ -231,6 +349,9 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='order_created_keyset_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
@@ -299,6 +420,9 @@ class AppNotification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='notification_keyset_idx'),
+        ]
 
     def __str__(self):
         return f"{self.type} - {self.title}"
@@ -0,0 +1,140 @@
+import logging
+import time
+
+from django.conf import settings
+
+from .cache import CACHE_ERRORS, cache_entry, catalog_cache, entry_timeout, get_or_compute
+from .models import Product
+from .product_rows import stored_cards
+from .serializers import ProductListSerializer, ProductDetailSerializer
+
+logger = logging.getLogger('core')
+
+# Bump whenever ProductListSerializer/ProductDetailSerializer output changes, so entries
+# written by the previous release are never served
+PRODUCT_CACHE_VERSION = 2
+
+CARD = 'card'      # list representation, used to hydrate collections
+DETAIL = 'detail'  # retrieve representation, with images
+SERIALIZERS = {
+    CARD: ProductListSerializer,
+    DETAIL: ProductDetailSerializer,
+}
+PREFETCH = {
+    CARD: ('categories', 'tags'),
+    DETAIL: ('categories', 'tags', 'images'),
+}
+
+
+def product_cache_key(kind, pk):
+    return f'product:v{PRODUCT_CACHE_VERSION}:{kind}:{pk}'
+
+
+def serialize_products(ids, kinds=(CARD, DETAIL)):
+    """
+    ``{kind: {pk: data}}`` for the products in ``ids``, loaded with a single prefetching
+    query. Cards alone are the stored ``Product.card`` column (core.product_rows), with no model instances.
+    """
+    if tuple(kinds) == (CARD,):
+        cards = stored_cards(Product.objects.filter(pk__in=ids).values('id', 'card'))
+        return {CARD: {card['id']: card for card in cards}}
+    prefetch = {name for kind in kinds for name in PREFETCH[kind]}
+    products = Product.objects.filter(pk__in=ids).prefetch_related(*sorted(prefetch))
+    result = {kind: {} for kind in kinds}
+    for product in products:
+        for kind in kinds:
+            result[kind][product.pk] = dict(SERIALIZERS[kind](product).data)
+    return result
+
+
+def get_products(kind, ids):
+    """
+    Cached ``kind`` representations for ``ids``, in the same order.
+
+    Cached entries come back in one ``get_many``. Misses (and entries past their
+    logical expiry) are loaded in one query, serialized and cached with ``set_many``.
+    Ids with no product are dropped. Entries use the ``get_or_compute`` envelope, so
+    single keys can also be read through it (see ``get_product_detail``). Without
+    Redis everything is loaded from the database.
+    """
+    keys = {pk: product_cache_key(kind, pk) for pk in ids}
+    try:
+        cached = catalog_cache.get_many(list(keys.values()))
+    except CACHE_ERRORS as e:
+        logger.warning(f"Product cache unavailable, loading {len(keys)} products uncached: {str(e)}")
+        cached = {}
+    now = time.time()
+    found = {
+        pk: cached[key]['value'] for pk, key in keys.items()
+        if key in cached and cached[key]['expires'] > now
+    }
+
+    missing = [pk for pk in keys if pk not in found]
+    if missing:
+        fresh = serialize_products(missing, kinds=(kind,))[kind]
+        store_products({kind: fresh})
+        found.update(fresh)
+
+    return [found[pk] for pk in ids if pk in found]
+
+
+def get_product_cards(ids):
+    return get_products(CARD, ids)
+
+
+def get_product_detail(pk):
+    """Detail representation of one product; a hot product expiring is recomputed by a single worker."""
+    detail, _ = get_or_compute(
+        product_cache_key(DETAIL, pk),
+        lambda: serialize_products([pk], kinds=(DETAIL,))[DETAIL].get(pk),
+        settings.PRODUCT_CACHE_TIMEOUT,
+        'product',
+    )
+    return detail
+
+
+def store_products(representations):
+    """Cache ``{kind: {pk: data}}`` in one ``set_many``."""
+    timeout = settings.PRODUCT_CACHE_TIMEOUT
+    entries = {
+        product_cache_key(kind, pk): cache_entry(data, timeout)
+        for kind, products in representations.items()
+        for pk, data in products.items()
+    }
+    if entries:
+        try:
+            catalog_cache.set_many(entries, timeout=entry_timeout(timeout))
+        except CACHE_ERRORS as e:
+            logger.warning(f"Could not cache {len(entries)} product representations: {str(e)}")
+
+
+def refresh_products(ids):
+    """
+    Write-through: rewrite every cached representation of ``ids`` from the database
+    (products that no longer exist are dropped). Called from core.signals after commit,
+    so failures are logged rather than raised: the write has already succeeded.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    try:
+        fresh = serialize_products(ids)
+        store_products(fresh)
+    except Exception as e:
+        logger.error(f"Write-through failed for {len(ids)} products, dropping them instead: {str(e)}")
+        invalidate_products(ids)
+        return
+    gone = set(ids) - set(fresh[CARD])
+    if gone:
+        invalidate_products(gone)
+
+
+def invalidate_products(ids):
+    """Drop the cached representations of ``ids``; the next read repopulates them."""
+    keys = [product_cache_key(kind, pk) for pk in ids for kind in SERIALIZERS]
+    if keys:
+        try:
+            catalog_cache.delete_many(keys)
+        except CACHE_ERRORS as e:
+            # Entries still expire after PRODUCT_CACHE_TIMEOUT
+            logger.error(f"Could not invalidate {len(ids)} cached products: {str(e)}")
@@ -0,0 +1,266 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.db.models import Q, QuerySet
+from rest_framework.response import Response
+
+from aquaticexotica_backend.streaming import StreamingJSONResponse
+from .models import Category, Product
+from .serializers import ProductListSerializer, TagSerializer
+
+# DRF's own formatting for the fields whose JSON form is not the database value
+_list_fields = ProductListSerializer().fields
+format_price = _list_fields["price"].to_representation
+format_compare_at_price = _list_fields["compare_at_price"].to_representation
+format_rating = _list_fields["rating"].to_representation
+format_tag_created_at = TagSerializer().fields["created_at"].to_representation
+
+
+def discount_percentage(row):
+    price, compare_at_price = row["price"], row["compare_at_price"]
+    if compare_at_price and price < compare_at_price:
+        return int(((compare_at_price - price) / compare_at_price) * 100)
+    return 0
+
+
+def tag_ids(tags):
+    return [tag["id"] for tag in tags]
+
+
+def _column(name):
+    return lambda row, categories, tags: row[name]
+
+
+# ProductListSerializer's output fields, in its order: (columns read, builder(row, categories, tags))
+ROW_FIELDS = {
+    "id": (("id",), _column("id")),
+    "name": (("name",), _column("name")),
+    "description": (("description",), _column("description")),
+    "price": (("price",), lambda row, categories, tags: format_price(row["price"])),
+    "compare_at_price": (("compare_at_price",), lambda row, categories, tags: (
+        None if row["compare_at_price"] is None else format_compare_at_price(row["compare_at_price"])
+    )),
+    "discount_percentage": (("price", "compare_at_price"), lambda row, categories, tags: discount_percentage(row)),
+    "stock": (("stock",), _column("stock")),
+    "categories": ((), lambda row, categories, tags: categories),
+    "tags": ((), lambda row, categories, tags: tag_ids(tags)),
+    "tag_details": ((), lambda row, categories, tags: tags),
+    "rating": (("rating",), lambda row, categories, tags: format_rating(row["rating"])),
+    "is_active": (("is_active",), _column("is_active")),
+    "is_new": (("is_new",), _column("is_new")),
+    "is_sale": (("is_sale",), _column("is_sale")),
+    "is_featured": (("is_featured",), _column("is_featured")),
+    "is_trending": (("is_trending",), _column("is_trending")),
+    "merchandising_rank": (("merchandising_rank",), _column("merchandising_rank")),
+    "is_in_stock": (("stock", "is_active"), lambda row, categories, tags: row["stock"] > 0 and row["is_active"]),
+    "image_url": (("image_url",), _column("image_url")),
+    "thumbnail_url": (("thumbnail_url",), _column("thumbnail_url")),
+}
+
+
+class RowPlan:
+    """The output fields, columns and relation queries needed for a field selection (None: everything)."""
+
+    def __init__(self, selection=None):
+        selects = selection.selects if selection is not None else lambda name: True
+        self.builders = tuple(
+            (name, builder) for name, (_, builder) in ROW_FIELDS.items() if selects(name)
+        )
+        self.columns = tuple(dict.fromkeys(
+            column for name, (columns, _) in ROW_FIELDS.items() if selects(name) for column in columns
+        ))
+        self.categories = selects("categories")
+        self.tags = selects("tags") or selects("tag_details")
+        # Relations would cost two more queries: read the stored cards instead, and trim them
+        # (which also collapses unexpanded categories/tag details)
+        self.selection = selection
+        self.uses_cards = self.categories or self.tags
+
+    def trim(self, card):
+        return card if self.selection is None else self.selection.trim(card)
+
+
+FULL_ROW_PLAN = RowPlan()
+
+
+def product_values(queryset, extra=(), plan=FULL_ROW_PLAN):
+    """``queryset`` as ``.values()`` dicts of the plan's columns (plus ``extra``, e.g. a cursor ordering field)."""
+    columns = ("id",) + plan.columns + tuple(extra)
+    return queryset.prefetch_related(None).values(*dict.fromkeys(columns))
+
+
+def linked_categories(ids):
+    """``{product_id: [category dict, ...]}`` in Category ordering, in one query on the through table."""
+    through = Product.categories.through.objects.filter(product_id__in=ids)
+    result = defaultdict(list)
+    ordering = [f"category__{name}" for name in Category._meta.ordering]
+    rows = through.order_by(*ordering, "category_id").values_list(
+        "product_id", "category_id", "category__name", "category__slug",
+        "category__description", "category__image_url",
+    )
+    for product_id, pk, name, slug, description, image_url in rows:
+        result[product_id].append(
+            {"id": pk, "name": name, "slug": slug, "description": description, "image_url": image_url}
+        )
+    return result
+
+
+def linked_tags(ids):
+    """``{product_id: [tag dict, ...]}`` in one query on the through table."""
+    through = Product.tags.through.objects.filter(product_id__in=ids).order_by("tag_id")
+    result = defaultdict(list)
+    for product_id, pk, name, created_at in through.values_list("product_id", "tag_id", "tag__name", "tag__created_at"):
+        result[product_id].append(
+            {"id": pk, "name": name, "created_at": format_tag_created_at(created_at)}
+        )
+    return result
+
+
+def serialize_product_rows(rows, plan=FULL_ROW_PLAN):
+    """
+    ProductListSerializer(many=True).data (trimmed to ``plan``) for ``.values()`` rows,
+    without model instances or serializer fields: at most one query each for the
+    category and tag links, then plain dict assembly.
+    """
+    rows = list(rows)
+    ids = [row["id"] for row in rows]
+    categories = linked_categories(ids) if ids and plan.categories else {}
+    tags = linked_tags(ids) if ids and plan.tags else {}
+    result = []
+    for row in rows:
+        row_categories = categories.get(row["id"], [])
+        row_tags = tags.get(row["id"], [])
+        result.append({name: build(row, row_categories, row_tags) for name, build in plan.builders})
+    return result
+
+
+# ----- stored cards -----
+
+# Bump whenever ROW_FIELDS or the category/tag shapes change: cards of another version are
+# treated as missing (computed on read) until rebuild_product_cards --missing rewrites them
+CARD_VERSION = 1
+CARD_VERSION_KEY = "_version"
+
+# jsonb keeps object keys in its own order; cards are read back in the serializers' order
+CATEGORY_KEYS = ("id", "name", "slug", "description", "image_url")
+TAG_KEYS = ("id", "name", "created_at")
+
+
+def is_current(card):
+    return card is not None and card.get(CARD_VERSION_KEY) == CARD_VERSION
+
+
+def outdated_cards(queryset):
+    """Products of ``queryset`` whose card is missing or of another CARD_VERSION."""
+    return queryset.filter(Q(card__isnull=True) | ~Q(card__contains={CARD_VERSION_KEY: CARD_VERSION}))
+
+
+def ordered_card(card):
+    card = {name: card[name] for name in ROW_FIELDS}
+    card["categories"] = [{name: category[name] for name in CATEGORY_KEYS} for category in card["categories"]]
+    card["tag_details"] = [{name: tag[name] for name in TAG_KEYS} for tag in card["tag_details"]]
+    return card
+
+
+def stored_cards(rows):
+    """
+    The ``card`` of each ``{'id', 'card'}`` row, in order. Cards not built yet (NULL,
+    e.g. before rebuild_product_cards ran) or built for another CARD_VERSION are
+    computed from the columns in one batch.
+    """
+    rows = list(rows)
+    missing = [row["id"] for row in rows if not is_current(row["card"])]
+    fresh = {}
+    if missing:
+        fresh = {card["id"]: card for card in serialize_product_rows(product_values(Product.objects.filter(pk__in=missing)))}
+    cards = []
+    for row in rows:
+        if is_current(row["card"]):
+            cards.append(ordered_card(row["card"]))
+        elif row["id"] in fresh:
+            cards.append(fresh[row["id"]])
+    return cards
+
+
+def update_product_cards(products, batch_size=500):
+    """
+    Recompute the stored ``card`` of a queryset or an iterable of product ids, ``batch_size``
+    products per UPDATE. Runs in the caller's transaction, so cards change with the rows they describe.
+    """
+    if isinstance(products, QuerySet):
+        products = products.values_list("pk", flat=True)
+    ids = iter(sorted(set(products)))
+    updated = 0
+    while batch := list(islice(ids, batch_size)):
+        cards = serialize_product_rows(product_values(Product.objects.filter(pk__in=batch)))
+        updated += Product.objects.bulk_update(
+            [Product(pk=card["id"], card={**card, CARD_VERSION_KEY: CARD_VERSION}) for card in cards], ["card"]
+        )
+    return updated
+
+
+# ----- list rendering -----
+
+def plan_values(queryset, plan, extra=()):
+    """Rows for ``serialize_rows``: the stored cards, or the plan's columns when no relation is selected."""
+    if plan.uses_cards:
+        return queryset.prefetch_related(None).values(*dict.fromkeys(("id", "card") + tuple(extra)))
+    return product_values(queryset, extra, plan)
+
+
+def serialize_rows(rows, plan=FULL_ROW_PLAN):
+    if plan.uses_cards:
+        return [plan.trim(card) for card in stored_cards(rows)]
+    return serialize_product_rows(rows, plan)
+
+
+def iter_product_rows(rows, batch_size, plan=FULL_ROW_PLAN):
+    """Serialize an iterable of ``plan_values`` rows ``batch_size`` at a time, for streaming."""
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield from serialize_rows(batch, plan)
+
+
+class ProductRowsMixin:
+    """
+    Read-only fast path for ProductListSerializer lists.
+
+    Actions named in ``row_actions`` page (or stream) ``.values()`` rows of the
+    filtered queryset instead of building ``Product`` instances and running the
+    serializer: the stored product cards, a single-table read, or, when the request's
+    field selection (``?fields=``/``?expand=``, see SparseFieldsMixin) needs no
+    categories or tags, just the selected columns. Must come before
+    StreamingListMixin, whose ``list_response`` it overrides.
+    """
+
+    row_actions = ()
+
+    @property
+    def row_plan(self):
+        selection = getattr(self, "field_selection", None)
+        return FULL_ROW_PLAN if selection is None else RowPlan(selection)
+
+    def row_queryset(self, queryset, plan):
+        # Keyset pagination reads its cursor position from the rows
+        extra = [name.lstrip("-") for name in getattr(self, "cursor_ordering", ())]
+        return plan_values(queryset, plan, extra)
+
+    def list(self, request, *args, **kwargs):
+        if self.action not in self.row_actions:
+            return super().list(request, *args, **kwargs)
+        plan = self.row_plan
+        queryset = self.row_queryset(self.filter_queryset(self.get_queryset()), plan)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_rows(page, plan))
+        return Response(serialize_rows(queryset, plan))
+
+    def list_response(self, queryset):
+        if self.action not in self.row_actions:
+            return super().list_response(queryset)
+        plan = self.row_plan
+        queryset = self.row_queryset(queryset, plan)
+        if self.action in self.stream_actions:
+            rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+            return StreamingJSONResponse(iter_product_rows(rows, self.stream_chunk_size, plan))
+        return Response(serialize_rows(queryset, plan))
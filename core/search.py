@@ -0,0 +1,150 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity, TrigramWordSimilarity
+)
+from django.db import connection, transaction
+from django.db.models import Case, F, OuterRef, Q, QuerySet, Subquery, TextField, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Product, Tag, Category
+from .synonyms import expand_query
+
+SEARCH_CONFIG = 'english'
+SEARCH_RANK = 'search_rank'
+
+
+def _related_names(model):
+    """Space separated names of the tags/categories linked to the outer product."""
+    names = (
+        model.objects.filter(products=OuterRef('pk'))
+        .values('products')
+        .annotate(names=StringAgg('name', delimiter=' '))
+        .values('names')[:1]
+    )
+    return Coalesce(Subquery(names), Value(''), output_field=TextField())
+
+
+def product_search_vector():
+    """Weighted search document: name (A), tags and categories (B), description (C)."""
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(_related_names(Tag), _related_names(Category), weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(products):
+    """Recompute the stored search vector for a queryset or an iterable of product ids."""
+    if not isinstance(products, QuerySet):
+        products = Product.objects.filter(pk__in=list(products))
+    return products.update(search_vector=product_search_vector())
+
+
+def build_search_query(value):
+    """Prefix-matching tsquery for each word of the user input (search-as-you-type)."""
+    terms = re.findall(r'\w+', value or '')
+    if not terms:
+        return None
+    raw = ' & '.join(f'{term}:*' for term in terms)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_products(queryset, value, expand_synonyms=True):
+    """
+    Filter a product queryset with the GIN-indexed search vector and order it by rank.
+    The query is expanded with admin-managed synonyms (common/scientific names) first.
+    """
+    if SEARCH_RANK in queryset.query.annotations:
+        # Already searched (the search filter and the filterset share the ``search`` param)
+        return queryset
+    variants = expand_query(value) if expand_synonyms else [value]
+    search_query = None
+    for variant in variants:
+        variant_query = build_search_query(variant)
+        if variant_query is not None:
+            search_query = variant_query if search_query is None else search_query | variant_query
+    if search_query is None:
+        return queryset.none()
+    return (
+        queryset.filter(search_vector=search_query)
+        .annotate(**{SEARCH_RANK: SearchRank(F('search_vector'), search_query)})
+        .order_by(f'-{SEARCH_RANK}', '-updated_at')
+    )
+
+
+def _set_trigram_threshold(threshold):
+    """Set the pg_trgm thresholds for the current transaction so the % / %> operators use the GIN indexes."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, true),"
+            " set_config('pg_trgm.word_similarity_threshold', %s, true)",
+            [str(threshold), str(threshold)],
+        )
+
+
+def fuzzy_match(value):
+    """
+    Product filter for names, tags or categories trigram-similar to ``value``. Runs the
+    tag and category lookups now, so call it where the trigram threshold is set.
+    """
+    match = Q(name__trigram_word_similar=value)
+    tag_ids = list(Tag.objects.filter(name__trigram_word_similar=value).values_list('pk', flat=True))
+    if tag_ids:
+        match |= Q(tag_ids__overlap=tag_ids)
+    category_ids = list(Category.objects.filter(name__trigram_word_similar=value).values_list('pk', flat=True))
+    if category_ids:
+        match |= Q(category_ids__overlap=category_ids)
+    return match
+
+
+def fuzzy_search_products(queryset, value, threshold=None, limit=None):
+    """
+    Typo tolerant product search: trigram word similarity against product, tag and
+    category names. Matching tags and categories are resolved first through their
+    trigram indexes, so products are matched by ``name %> q OR tag_ids && ... OR
+    category_ids && ...``, each arm GIN indexed (a bitmap OR, no sequential scan).
+    Matching ids are ranked inside one transaction (where the threshold applies),
+    then returned as a queryset in rank order.
+    """
+    threshold = settings.FUZZY_SEARCH_THRESHOLD if threshold is None else threshold
+    limit = settings.FUZZY_SEARCH_MAX_RESULTS if limit is None else limit
+
+    with transaction.atomic():
+        _set_trigram_threshold(threshold)
+        ranked = (
+            queryset.filter(fuzzy_match(value))
+            .annotate(similarity=TrigramWordSimilarity(value, 'name'))
+            .order_by('-similarity', '-updated_at')
+            .values_list('pk', flat=True)
+        )
+        product_ids = list(ranked[:limit])
+
+    if not product_ids:
+        return queryset.none()
+    rank = Case(*[When(pk=pk, then=position) for position, pk in enumerate(product_ids)])
+    return queryset.filter(pk__in=product_ids).order_by(rank)
+
+
+def suggest_terms(value, threshold=None, limit=5):
+    """'Did you mean' suggestions: the closest product, tag and category names by trigram similarity."""
+    threshold = settings.FUZZY_SEARCH_THRESHOLD if threshold is None else threshold
+    candidates = []
+    with transaction.atomic():
+        _set_trigram_threshold(threshold)
+        # Inactive products are not listed, so their names are no suggestion
+        for names in (Product.objects.filter(is_active=True), Tag.objects.all(), Category.objects.all()):
+            candidates.extend(
+                names.filter(name__trigram_similar=value)
+                .annotate(similarity=TrigramSimilarity('name', value))
+                .order_by('-similarity')
+                .values_list('name', 'similarity')[:limit]
+            )
+
+    suggestions = []
+    for name, _ in sorted(candidates, key=lambda candidate: candidate[1], reverse=True):
+        if name.lower() != value.lower() and name not in suggestions:
+            suggestions.append(name)
+    return suggestions[:limit]
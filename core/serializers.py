@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from .compiled_serializers import CompiledModelSerializer
 from .models import (
     Product, Category, ShippingAddress, Order, OrderItem,
     ProductImage, Cart, CartItem, StockNotification, Tag, AppNotification
@@ -8,7 +9,7 @@ from .models import (
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CompiledModelSerializer):
     is_admin = serializers.SerializerMethodField()
 
     class Meta:
@@ -29,28 +30,28 @@ class UserSerializer(serializers.ModelSerializer):
         return obj.is_staff
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(CompiledModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(CompiledModelSerializer):
     class Meta:
         model = Category
         fields = ("id", "name", "slug", "description", "image_url")
         read_only_fields = ("id",)
 
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(CompiledModelSerializer):
     class Meta:
         model = ProductImage
         fields = ("id", "image_url", "order", "created_at")
         read_only_fields = ("id", "created_at")
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(CompiledModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), write_only=True, source="category"
@@ -64,6 +65,11 @@ class ProductSerializer(serializers.ModelSerializer):
     )
     tag_details = TagSerializer(source='tags', many=True, read_only=True)
 
+    field_columns = {
+        "discount_percentage": ("price", "compare_at_price"),
+        "is_in_stock": ("stock", "is_active"),
+        "category": (),  # Product has no single category; DRF skips the field
+    }
 
     class Meta:
         model = Product
@@ -127,7 +133,7 @@ class ProductSerializer(serializers.ModelSerializer):
             return representation
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(CompiledModelSerializer):
     """Serializer for listing products (no images)"""
     categories = CategorySerializer(many=True, read_only=True)
     category_ids = serializers.PrimaryKeyRelatedField(
@@ -139,6 +145,11 @@ class ProductListSerializer(serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
     tag_details = TagSerializer(source="tags", many=True, read_only=True)
 
+    field_columns = {
+        "discount_percentage": ("price", "compare_at_price"),
+        "is_in_stock": ("stock", "is_active"),
+    }
+
     class Meta:
         model = Product
         fields = (
@@ -158,6 +169,7 @@ class ProductListSerializer(serializers.ModelSerializer):
             "is_sale",
             "is_featured",
             "is_trending",
+            "merchandising_rank",
             "is_in_stock",
             "image_url",
             "thumbnail_url",
@@ -195,7 +207,7 @@ class ProductDetailSerializer(ProductListSerializer):
         fields = ProductListSerializer.Meta.fields + ("images",)
 
 
-class ShippingAddressSerializer(serializers.ModelSerializer):
+class ShippingAddressSerializer(CompiledModelSerializer):
     class Meta:
         model = ShippingAddress
         fields = (
@@ -214,13 +226,15 @@ class ShippingAddressSerializer(serializers.ModelSerializer):
         read_only_fields = ("id",)
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(CompiledModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(), write_only=True
     )
     total_price = serializers.SerializerMethodField()
 
+    field_columns = {"total_price": ("quantity", "price")}
+
     class Meta:
         model = OrderItem
         fields = ("id", "product", "product_id", "quantity", "price", "total_price")
@@ -230,7 +244,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         return obj.quantity * obj.price  # Use stored price instead of product.price
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(CompiledModelSerializer):
     items = OrderItemSerializer(many=True)  # now writeable
     shipping_address = ShippingAddressSerializer(read_only=True)
     grand_total = serializers.SerializerMethodField()
@@ -250,6 +264,8 @@ class OrderSerializer(serializers.ModelSerializer):
     recipient_phone = serializers.CharField(write_only=True, required=False)
     is_default = serializers.BooleanField(write_only=True, required=False)
 
+    field_columns = {"grand_total": ("total_amount", "shipping_cost")}
+
     class Meta:
         model = Order
         fields = (
@@ -323,7 +339,7 @@ class OrderSerializer(serializers.ModelSerializer):
         return order
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(CompiledModelSerializer):
     product = ProductSerializer(read_only=True)
     total_price = serializers.SerializerMethodField()
 
@@ -336,7 +352,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         return obj.quantity * obj.product.price
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(CompiledModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_items = serializers.SerializerMethodField()
     total_price = serializers.SerializerMethodField()
@@ -353,7 +369,7 @@ class CartSerializer(serializers.ModelSerializer):
         return sum(item.total_price for item in obj.items.all())
 
 
-class StockNotificationSerializer(serializers.ModelSerializer):
+class StockNotificationSerializer(CompiledModelSerializer):
     product = ProductSerializer(read_only=True)
 
     class Meta:
@@ -362,7 +378,7 @@ class StockNotificationSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "created_at")
 
 
-class AppNotificationSerializer(serializers.ModelSerializer):
+class AppNotificationSerializer(CompiledModelSerializer):
     class Meta:
         model = AppNotification
         fields = [
@@ -1,4 +1,5 @@
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.conf import settings
 from django.utils.timezone import now
@@ -6,10 +7,22 @@ from django.utils.timezone import now
 from .models import (
     User,
     Product,
+    ProductImage,
+    Category,
+    Tag,
     Order,
+    OrderItem,
     StockNotification,
     AppNotification, NotificationType,
+    SynonymGroup,
 )
+from .autocomplete import autocomplete_index
+from .cache import bump_catalog_version, bump_stock_version
+from .merchandising import sync_product, remove_product
+from .product_cache import refresh_products, invalidate_products
+from .product_rows import update_product_cards
+from .search import update_search_vectors
+from .synonyms import invalidate_synonym_table
 
 
 # ----------------------------
@@ -138,3 +151,314 @@ def low_stock_notification(sender, instance, **kwargs):
 #             # Mark as notified to prevent duplicates
 #             sub.is_notified = True
 #             sub.save(update_fields=["is_notified"])
+
+
+# ----------------------------
+# 6. PRODUCT SEARCH VECTOR
+# ----------------------------
+def changed_product_ids(instance, action, reverse, pk_set):
+    """
+    Product ids affected by an m2m_changed event on Product.tags / Product.categories.
+    Returns None for the pre_* actions, except reverse pre_clear, which stashes the
+    linked product ids on the tag/category so post_clear can still see them.
+    """
+    if not reverse:
+        return [instance.pk] if action.startswith('post_') else None
+    if action == 'pre_clear':
+        instance._cleared_product_ids = list(instance.products.values_list('pk', flat=True))
+        return None
+    if action == 'post_clear':
+        return getattr(instance, '_cleared_product_ids', [])
+    if action.startswith('post_'):
+        return list(pk_set or [])
+    return None
+
+
+@receiver(post_save, sender=Product)
+def product_search_vector_on_save(sender, instance, **kwargs):
+    update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+@receiver(m2m_changed, sender=Product.categories.through)
+def product_search_vector_on_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    product_ids = changed_product_ids(instance, action, reverse, pk_set)
+    if product_ids:
+        update_search_vectors(product_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Category)
+def product_search_vector_on_rename(sender, instance, created, **kwargs):
+    if not created:
+        # Tag/category names are part of the product document
+        update_search_vectors(Product.objects.filter(pk__in=instance.products.values('pk')))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Category)
+def product_search_vector_on_label_delete(sender, instance, **kwargs):
+    # The through rows go with the tag/category without an m2m_changed signal; the ids
+    # are also read by the product card and id array receivers below
+    instance._linked_product_ids = list(instance.products.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def product_search_vector_on_label_deleted(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_linked_product_ids', [])
+    if product_ids:
+        update_search_vectors(product_ids)
+
+
+# ----------------------------
+# 7. AUTOCOMPLETE INDEX
+# ----------------------------
+# Applied once the transaction commits, so rolled-back writes never show up in suggestions.
+@receiver(post_save, sender=Product)
+def autocomplete_product_saved(sender, instance, **kwargs):
+    pk, name = instance.pk, instance.name
+    if instance.is_active:
+        transaction.on_commit(lambda: autocomplete_index.add('product', pk, name))
+    else:
+        transaction.on_commit(lambda: autocomplete_index.remove('product', pk))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Category)
+def autocomplete_label_saved(sender, instance, **kwargs):
+    kind, pk, name = sender.__name__.lower(), instance.pk, instance.name
+    transaction.on_commit(lambda: autocomplete_index.add(kind, pk, name))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def autocomplete_label_deleted(sender, instance, **kwargs):
+    kind, pk = sender.__name__.lower(), instance.pk
+    transaction.on_commit(lambda: autocomplete_index.remove(kind, pk))
+
+
+@receiver(post_save, sender=OrderItem)
+def autocomplete_product_ordered(sender, instance, created, **kwargs):
+    if created:
+        product_id = instance.product_id
+        transaction.on_commit(lambda: autocomplete_index.adjust_popularity('product', product_id, 1))
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+@receiver(m2m_changed, sender=Product.categories.through)
+def autocomplete_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Tags and categories are ranked by how many products they are linked to."""
+    kind = 'tag' if sender is Product.tags.through else 'category'
+    relation = 'tags' if kind == 'tag' else 'categories'
+
+    if action == 'pre_clear':
+        # Remember what is about to be unlinked; post_clear has no pk_set
+        if reverse:
+            instance._cleared_autocomplete_links = {instance.pk: instance.products.count()}
+        else:
+            ids = getattr(instance, relation).values_list('pk', flat=True)
+            instance._cleared_autocomplete_links = {pk: 1 for pk in ids}
+        return
+
+    if action == 'post_clear':
+        links, sign = getattr(instance, '_cleared_autocomplete_links', {}), -1
+    elif action in ('post_add', 'post_remove'):
+        links = {instance.pk: len(pk_set)} if reverse else {pk: 1 for pk in pk_set}
+        sign = 1 if action == 'post_add' else -1
+    else:
+        return
+
+    def apply():
+        for pk, count in links.items():
+            autocomplete_index.adjust_popularity(kind, pk, sign * count)
+    transaction.on_commit(apply)
+
+
+# ----------------------------
+# 8. SEARCH SYNONYMS
+# ----------------------------
+@receiver(post_save, sender=SynonymGroup)
+@receiver(post_delete, sender=SynonymGroup)
+def synonym_table_changed(sender, instance, **kwargs):
+    # After commit: a table recompiled from the old rows in between would otherwise be kept indefinitely
+    transaction.on_commit(invalidate_synonym_table)
+
+
+# ----------------------------
+# 9. MERCHANDISING COLLECTIONS & PRODUCT CACHE
+# ----------------------------
+# Redis is only touched once the transaction commits, so readers never cache uncommitted rows.
+# Single-product changes rewrite the cached representations (write-through); changes that
+# fan out to many products just drop them and let the next read repopulate.
+@receiver(post_save, sender=Product)
+def merchandising_product_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: sync_product(instance))
+    transaction.on_commit(lambda: refresh_products([instance.pk]))
+
+
+@receiver(post_delete, sender=Product)
+def merchandising_product_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: remove_product(pk))
+    transaction.on_commit(lambda: invalidate_products([pk]))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_cache_on_image(sender, instance, **kwargs):
+    product_id = instance.product_id
+    transaction.on_commit(lambda: refresh_products([product_id]))
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+@receiver(m2m_changed, sender=Product.categories.through)
+def product_cache_on_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    # post_clear relies on the ids stashed by product_search_vector_on_relations at pre_clear
+    if not action.startswith('post_'):
+        return
+    product_ids = changed_product_ids(instance, action, reverse, pk_set)
+    update = invalidate_products if reverse else refresh_products
+    transaction.on_commit(lambda: update(product_ids))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Category)
+def product_cache_on_rename(sender, instance, created, **kwargs):
+    if not created:
+        product_ids = list(instance.products.values_list('pk', flat=True))
+        transaction.on_commit(lambda: invalidate_products(product_ids))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Category)
+def product_cache_on_label_delete(sender, instance, **kwargs):
+    # The through rows go with the tag/category without an m2m_changed signal
+    product_ids = list(instance.products.values_list('pk', flat=True))
+    transaction.on_commit(lambda: invalidate_products(product_ids))
+
+
+# ----------------------------
+# 10. CATALOG VERSION
+# ----------------------------
+# Any catalog write (API, admin or shell) moves cached list/facet responses to a new
+# catalog:v<N> namespace instead of scanning for keys to delete. Saves that only move a
+# product's stock count (order fulfilment, restocking) bump the stock version instead:
+# list contents stay valid and only the counts inside them are refreshed.
+STOCK_ONLY_FIELDS = {'stock', 'updated_at', 'search_vector', 'card', 'category_ids', 'tag_ids'}
+
+
+def loaded_field_values(instance):
+    return {
+        field.attname: instance.__dict__[field.attname]
+        for field in instance._meta.concrete_fields if field.attname in instance.__dict__
+    }
+
+
+def is_stock_only_change(instance, created):
+    loaded = getattr(instance, '_loaded_values', None)
+    if created or loaded is None:
+        return False
+    # Deferred fields assigned after loading count as changed
+    changed = {
+        name for name, value in loaded_field_values(instance).items()
+        if name not in loaded or loaded[name] != value
+    }
+    if not changed <= STOCK_ONLY_FIELDS:
+        return False
+    old_stock = loaded.get('stock', instance.stock)
+    return (old_stock > 0) == (instance.stock > 0)
+
+
+@receiver(post_save, sender=Product)
+def catalog_product_saved(sender, instance, created, **kwargs):
+    if is_stock_only_change(instance, created):
+        transaction.on_commit(bump_stock_version)
+    else:
+        transaction.on_commit(bump_catalog_version)
+    # The next save of this instance is compared with what was just written
+    instance._loaded_values = loaded_field_values(instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=SynonymGroup)
+@receiver(post_delete, sender=SynonymGroup)
+def catalog_changed(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+@receiver(m2m_changed, sender=Product.categories.through)
+def catalog_relations_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(bump_catalog_version)
+
+
+# ----------------------------
+# 11. PRODUCT CARDS
+# ----------------------------
+# Product.card is rewritten inside the write's transaction (bulk updates, no signals), so
+# list endpoints and the product cache never read a card older than the row it describes.
+@receiver(post_save, sender=Product)
+def product_card_on_save(sender, instance, **kwargs):
+    update_product_cards([instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+@receiver(m2m_changed, sender=Product.categories.through)
+def product_card_on_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    # post_clear relies on the ids stashed by product_search_vector_on_relations at pre_clear
+    if action.startswith('post_'):
+        product_ids = changed_product_ids(instance, action, reverse, pk_set)
+        if product_ids:
+            update_product_cards(product_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Category)
+def product_card_on_rename(sender, instance, created, **kwargs):
+    if not created:
+        update_product_cards(instance.products.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def product_card_on_label_deleted(sender, instance, **kwargs):
+    # Ids stashed by product_search_vector_on_label_delete
+    update_product_cards(getattr(instance, '_linked_product_ids', []))
+
+
+# ----------------------------
+# 12. CATEGORY/TAG ID ARRAYS
+# ----------------------------
+# Product.category_ids/tag_ids mirror the through tables (see ProductQuerySet). Saves resync
+# too, so an instance loaded before an m2m change cannot write its stale arrays back.
+@receiver(post_save, sender=Product)
+def relation_arrays_on_save(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.pk).sync_relation_arrays()
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+@receiver(m2m_changed, sender=Product.categories.through)
+def relation_arrays_on_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    # post_clear relies on the ids stashed by product_search_vector_on_relations at pre_clear
+    if action.startswith('post_'):
+        product_ids = changed_product_ids(instance, action, reverse, pk_set)
+        if product_ids:
+            Product.objects.filter(pk__in=product_ids).sync_relation_arrays()
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def relation_arrays_on_label_deleted(sender, instance, **kwargs):
+    # Ids stashed by product_search_vector_on_label_delete
+    product_ids = getattr(instance, '_linked_product_ids', [])
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).sync_relation_arrays()
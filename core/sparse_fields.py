@@ -0,0 +1,215 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_paths(value):
+    """``"id,items.quantity,items.product.name"`` -> ``{'id': {}, 'items': {'quantity': {}, 'product': {'name': {}}}}``"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def _freeze(tree):
+    if tree is None:
+        return None
+    return tuple(sorted((name, _freeze(child)) for name, child in tree.items()))
+
+
+class FieldSelection:
+    """
+    What a client asked for with ``?fields=`` and ``?expand=``, at one level of the representation.
+
+    ``fields`` is a tree of dotted paths (``None``: every field). ``expand`` is a tree of
+    the nested objects to embed (``None``: all of them, the default); once ``?expand=`` is
+    given, unlisted nested serializers collapse to their primary key(s).
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        """The selection of a request, or None when it asks for the full representation."""
+        if FIELDS_PARAM not in query_params and EXPAND_PARAM not in query_params:
+            return None
+        fields = parse_paths(query_params[FIELDS_PARAM]) if query_params.get(FIELDS_PARAM) else None
+        expand = parse_paths(query_params[EXPAND_PARAM]) if EXPAND_PARAM in query_params else None
+        return cls(fields, expand)
+
+    @property
+    def key(self):
+        return _freeze(self.fields), _freeze(self.expand)
+
+    @property
+    def is_full(self):
+        return self.fields is None and self.expand is None
+
+    def selects(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.expand is None or name in self.expand
+
+    def child(self, name):
+        fields = None
+        if self.fields is not None:
+            # "items" alone selects all of items; "items.quantity" only that
+            fields = self.fields.get(name) or None
+        expand = self.expand.get(name, {}) if self.expand is not None else None
+        return FieldSelection(fields, expand)
+
+    def trim(self, data):
+        """Apply the selection to an already built representation (e.g. one read from a cache)."""
+        if self.is_full or not isinstance(data, dict):
+            return data
+        trimmed = {}
+        for name, value in data.items():
+            if not self.selects(name):
+                continue
+            if isinstance(value, (dict, list)) and not self.expands(name):
+                value = _collapse(value)
+            elif isinstance(value, dict) or (isinstance(value, list) and value and isinstance(value[0], dict)):
+                child = self.child(name)
+                value = [child.trim(item) for item in value] if isinstance(value, list) else child.trim(value)
+            trimmed[name] = value
+        return trimmed
+
+
+def _collapse(value):
+    if isinstance(value, dict):
+        return value.get('id')
+    return [item.get('id') if isinstance(item, dict) else item for item in value]
+
+
+def collapsed_field(field, name):
+    """A nested serializer replaced by the primary key(s) of the objects it would embed."""
+    kwargs = {'read_only': True, 'many': isinstance(field, serializers.ListSerializer)}
+    if field.source and field.source != name:
+        kwargs['source'] = field.source
+    return PrimaryKeyRelatedField(**kwargs)
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Trims ``fields`` to the ``field_selection`` in the serializer context (set by
+    SparseFieldsMixin), following the nesting path for nested serializers.
+
+    ``field_columns`` names the model columns behind fields that are not columns
+    themselves (method fields, properties), so querysets can be narrowed with ``.only()``.
+    """
+
+    field_columns = {}
+    is_trimmed = False
+
+    @property
+    def field_selection(self):
+        selection = self.context.get('field_selection')
+        if selection is None:
+            return None
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        for name in reversed(path):
+            selection = selection.child(name)
+        return selection
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.field_selection
+        if selection is None or selection.is_full:
+            return fields
+        self.is_trimmed = True
+        for name, field in list(fields.items()):
+            if field.write_only:
+                continue
+            if not selection.selects(name):
+                del fields[name]
+            elif isinstance(field, serializers.BaseSerializer) and not selection.expands(name):
+                fields[name] = collapsed_field(field, name)
+        return fields
+
+
+def _relation(model, source):
+    try:
+        return model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+
+
+def narrow_queryset(queryset, serializer, extra_columns=()):
+    """
+    ``queryset`` loading only what ``serializer`` (already trimmed) renders: ``.only()``
+    the columns behind its fields, and prefetch the relations it embeds or lists, each
+    narrowed the same way. Columns stay undeferred when a field's columns are unknown.
+    """
+    model = queryset.model
+    columns = {model._meta.pk.attname, *extra_columns}
+    prefetches = []
+    defer = True
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        source = field.source
+        relation = _relation(model, source) if source != '*' else None
+
+        if isinstance(field, serializers.BaseSerializer) and relation is not None and relation.is_relation:
+            child = field.child if isinstance(field, serializers.ListSerializer) else field
+            # Prefetched rows of a reverse foreign key are matched to their parent through that column
+            parent_column = (relation.field.attname,) if relation.one_to_many else ()
+            related = narrow_queryset(relation.related_model._default_manager.all(), child, parent_column)
+            if relation.many_to_one:
+                columns.add(relation.attname)
+            prefetches.append(Prefetch(source, queryset=related))
+        elif isinstance(field, ManyRelatedField) and relation is not None:
+            related_columns = [relation.related_model._meta.pk.attname]
+            if relation.one_to_many:
+                related_columns.append(relation.field.attname)
+            related = relation.related_model._default_manager.only(*related_columns)
+            prefetches.append(Prefetch(source, queryset=related))
+        elif relation is not None and relation.concrete:
+            columns.add(relation.attname)
+        elif name in serializer.field_columns:
+            columns.update(serializer.field_columns[name])
+        else:
+            defer = False
+
+    queryset = queryset.prefetch_related(None).prefetch_related(*prefetches)
+    return queryset.only(*columns) if defer else queryset
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=`` / ``?expand=`` for read requests: the serializer renders only the selected
+    fields and collapses unexpanded nested objects to ids, and ``sparse_queryset`` drops
+    the unneeded columns and prefetches. Writes always use the full representation.
+    """
+
+    @property
+    def field_selection(self):
+        if self.request is None or self.request.method not in ('GET', 'HEAD'):
+            return None
+        return FieldSelection.from_query_params(self.request.query_params)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['field_selection'] = self.field_selection
+        return context
+
+    def sparse_queryset(self, queryset):
+        selection = self.field_selection
+        if selection is None or selection.is_full:
+            return queryset
+        serializer = self.get_serializer_class()(context={'field_selection': selection})
+        return narrow_queryset(queryset, serializer)
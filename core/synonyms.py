@@ -0,0 +1,75 @@
+import logging
+
+from django.core.cache import cache
+
+from .cache import CACHE_ERRORS
+from .models import SynonymGroup
+
+logger = logging.getLogger('core')
+
+SYNONYM_TABLE_CACHE_KEY = 'search_synonym_table'
+
+
+def compile_synonym_table():
+    """
+    Compile the active synonym groups into ``{"max_words": n, "terms": {term: [alternatives]}}``.
+    Terms are lowercased, whitespace-normalized phrases.
+    """
+    terms = {}
+    for group in SynonymGroup.objects.filter(is_active=True):
+        group_terms = group.get_terms_list()
+        for term in group_terms:
+            alternatives = terms.setdefault(term, [])
+            alternatives.extend(t for t in group_terms if t != term and t not in alternatives)
+    max_words = max((len(term.split()) for term in terms), default=0)
+    return {"max_words": max_words, "terms": terms}
+
+
+def get_synonym_table():
+    """The compiled table from the cache; compiled per call while Redis is unreachable."""
+    try:
+        table = cache.get(SYNONYM_TABLE_CACHE_KEY)
+    except CACHE_ERRORS as e:
+        logger.warning(f"Synonym table cache unavailable, compiling uncached: {str(e)}")
+        return compile_synonym_table()
+    if table is None:
+        logger.info("Synonym table cache miss - compiling from database")
+        table = compile_synonym_table()
+        try:
+            cache.set(SYNONYM_TABLE_CACHE_KEY, table, timeout=None)
+        except CACHE_ERRORS as e:
+            logger.warning(f"Could not cache the synonym table: {str(e)}")
+    return table
+
+
+def invalidate_synonym_table():
+    try:
+        cache.delete(SYNONYM_TABLE_CACHE_KEY)
+    except CACHE_ERRORS as e:
+        logger.error(f"Synonym table invalidation failed: {str(e)}")
+
+
+def expand_query(value):
+    """
+    Return the query followed by one variant per synonym phrase found in it, e.g.
+    "neon tetra school" -> ["neon tetra school", "paracheirodon innesi school"].
+    Longest phrases win; phrases are replaced one at a time, not combined.
+    """
+    words = value.lower().split()
+    variants = [' '.join(words)]
+    table = get_synonym_table()
+    if not words or not table["terms"]:
+        return variants
+
+    i = 0
+    while i < len(words):
+        for size in range(min(table["max_words"], len(words) - i), 0, -1):
+            alternatives = table["terms"].get(' '.join(words[i:i + size]))
+            if alternatives:
+                for alternative in alternatives:
+                    variants.append(' '.join(words[:i] + [alternative] + words[i + size:]))
+                i += size
+                break
+        else:
+            i += 1
+    return variants
@@ -1,3 +1,1162 @@
-from django.test import TestCase
+import gzip
+import json
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.core.paginator import EmptyPage
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, QueryDict
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+from rest_framework.permissions import BasePermission
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from aquaticexotica_backend.middleware.camelsnakecase_middleware import (CamelSnakeCaseMiddleware, KeyTranslator,
+                                                                       camel_to_snake, snake_to_camel)
+from aquaticexotica_backend.middleware.compression_middleware import (CompressionMiddleware, compression_exempt,
+                                                                     negotiate_encoding)
+from aquaticexotica_backend.pagination import EstimatedCountPaginator, KeysetPagination
+from aquaticexotica_backend.parsers import CamelCaseJSONParser
+from aquaticexotica_backend.renderers import CamelCaseJSONRenderer
+from aquaticexotica_backend.streaming import iter_json_array
+from aquaticexotica_backend.tiered_cache import MISSING, LocalLRU, TieredCache
+from .autocomplete import AutocompleteIndex, PrefixIndex, tokenize
+from .cache import bump_catalog_version, cache_entry, get_or_compute
+from .category_catalog import build_category_catalog
+from .compiled_serializers import compile_plan, serializer_compiler
+from .facets import compute_facets, facets_cache_key
+from .filters import ProductFilter
+from .management.commands.index_usage import human_size
+from .merchandising import MerchandisingCollection, product_score, rebuild_collection
+from .models import Category, Order, Product, ProductImage, SynonymGroup, Tag
+from .product_cache import refresh_products
+from .product_rows import (CARD_VERSION, CARD_VERSION_KEY, outdated_cards, product_values, serialize_product_rows,
+                           stored_cards)
+from .search import _set_trigram_threshold, fuzzy_match, fuzzy_search_products, search_products, suggest_terms
+from .serializers import OrderSerializer, ProductDetailSerializer, ProductListSerializer, ProductSerializer
+from .sparse_fields import FieldSelection, narrow_queryset, parse_paths
+from .synonyms import expand_query
+from .views import ProductViewSet
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def plan_node_types(plan):
+    for node in plan_nodes(plan):
+        yield node['Node Type']
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are PostgreSQL specific')
+class ProductRelationFilterPlanTests(TestCase):
+    """Category/tag filters must be array predicates on core_product: no DISTINCT, no dedupe of product rows."""
+
+    PRODUCT_COUNT = 100_000
+    CATEGORY_COUNT = 50
+    TAG_COUNT = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = Category.objects.bulk_create(
+            Category(name=f'Category {i}', slug=f'category-{i}') for i in range(cls.CATEGORY_COUNT)
+        )
+        cls.tags = Tag.objects.bulk_create(Tag(name=f'tag-{i}') for i in range(cls.TAG_COUNT))
+        Product.objects.bulk_create(
+            (
+                Product(name=f'Product {i}', description='Long description ' * 50, price=Decimal('99.00'), stock=i % 20)
+                for i in range(cls.PRODUCT_COUNT)
+            ),
+            batch_size=5000,
+        )
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+
+        # Two categories and two tags per product, so a join would return most rows twice
+        ProductCategory = Product.categories.through
+        ProductTag = Product.tags.through
+        ProductCategory.objects.bulk_create(
+            (
+                ProductCategory(product_id=pk, category_id=cls.categories[(i + offset) % cls.CATEGORY_COUNT].pk)
+                for i, pk in enumerate(product_ids) for offset in (0, 1)
+            ),
+            batch_size=10000,
+        )
+        ProductTag.objects.bulk_create(
+            (
+                ProductTag(product_id=pk, tag_id=cls.tags[(i + offset) % cls.TAG_COUNT].pk)
+                for i, pk in enumerate(product_ids) for offset in (0, 1)
+            ),
+            batch_size=10000,
+        )
+        # bulk_create sends no m2m_changed
+        Product.objects.sync_relation_arrays()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_product, core_product_categories, core_product_tags, core_category')
+
+    def assertNoDedupe(self, queryset):
+        self.assertNotIn('DISTINCT', str(queryset.query).upper())
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        node_types = set(plan_node_types(plan))
+        self.assertNotIn('Unique', node_types)
+        self.assertNotIn('Aggregate', node_types)
+
+    def view_queryset(self, **params):
+        view = ProductViewSet(action='list', format_kwarg=None)
+        view.request = Request(APIRequestFactory().get('/api/products/', params))
+        return view.get_queryset()
+
+    def test_category_id_filter(self):
+        first, second = self.categories[0], self.categories[1]
+        queryset = ProductFilter(
+            {'category_id': f'{first.pk},{second.pk}'}, queryset=self.view_queryset()
+        ).qs
+        self.assertNoDedupe(queryset)
+        # Products in category 0 and 1 share rows; each must be counted once
+        self.assertEqual(queryset.count(), self.PRODUCT_COUNT * 3 // self.CATEGORY_COUNT)
+
+    def test_category_name_param(self):
+        queryset = self.view_queryset(category=self.categories[2].name)
+        self.assertNoDedupe(queryset)
+        self.assertEqual(queryset.count(), self.PRODUCT_COUNT * 2 // self.CATEGORY_COUNT)
+
+    def test_category_slug_action(self):
+        queryset = self.view_queryset().in_category(slug__iexact=self.categories[3].slug.upper())
+        self.assertNoDedupe(queryset)
+        self.assertEqual(queryset.count(), self.PRODUCT_COUNT * 2 // self.CATEGORY_COUNT)
+
+    def test_related_products(self):
+        product = Product.objects.order_by('pk').first()
+        queryset = self.view_queryset().in_categories(product.categories.values('pk')).exclude(pk=product.pk)
+        self.assertNoDedupe(queryset)
+        self.assertNoDedupe(Product.objects.with_tags(product.tags.values('pk')).exclude(pk=product.pk))
+
+    def test_tag_id_filters(self):
+        first, second = self.tags[0], self.tags[1]
+        any_of = ProductFilter({'tag_id': f'{first.pk},{second.pk}'}, queryset=self.view_queryset()).qs
+        all_of = ProductFilter({'tag_id_all': f'{first.pk},{second.pk}'}, queryset=self.view_queryset()).qs
+        self.assertNoDedupe(any_of)
+        self.assertEqual(any_of.count(), self.PRODUCT_COUNT * 3 // self.TAG_COUNT)
+        self.assertEqual(all_of.count(), self.PRODUCT_COUNT // self.TAG_COUNT)
+
+    def test_category_endpoint_issues_no_distinct(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/products/category/{self.categories[4].slug}')
+            b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            self.assertNotIn('DISTINCT', query['sql'].upper())
+
+
+class RelationArrayTests(TestCase):
+    """Product.category_ids/tag_ids must follow the through tables."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.plants = Category.objects.create(name='Plants', slug='plants')
+        cls.fish = Category.objects.create(name='Fish', slug='fish')
+        cls.rare = Tag.objects.create(name='rare')
+        cls.product = Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'))
+
+    def arrays(self):
+        return Product.objects.values_list('category_ids', 'tag_ids').get(pk=self.product.pk)
+
+    def test_m2m_changes(self):
+        self.product.categories.set([self.fish, self.plants])
+        self.rare.products.add(self.product)
+        self.assertEqual(self.arrays(), (sorted([self.fish.pk, self.plants.pk]), [self.rare.pk]))
+
+        self.plants.products.clear()
+        self.rare.delete()
+        self.assertEqual(self.arrays(), ([self.fish.pk], []))
+
+    def test_stale_instance_save_resyncs(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        self.product.categories.add(self.fish)
+        stale.save()
+        self.assertEqual(self.arrays(), ([self.fish.pk], []))
+
+    def test_checker_repairs_drift(self):
+        self.product.tags.add(self.rare)
+        Product.objects.filter(pk=self.product.pk).update(tag_ids=[], category_ids=[self.plants.pk])
+        with self.assertRaises(CommandError):
+            call_command('check_relation_arrays', '--dry-run', stdout=StringIO())
+        call_command('check_relation_arrays', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(self.arrays(), ([], [self.rare.pk]))
+        self.assertFalse(Product.objects.relation_array_drift().exists())
+
+
+class ProductRowsContractTests(TestCase):
+    """The values() fast path must render exactly what ProductListSerializer renders."""
+
+    @classmethod
+    def setUpTestData(cls):
+        plants = Category.objects.create(name='Plants', slug='plants', description='Live plants')
+        fish = Category.objects.create(name='Fish', slug='fish', image_url='https://example.com/fish.png')
+        rare, beginner = Tag.objects.create(name='rare'), Tag.objects.create(name='beginner')
+        products = [
+            Product.objects.create(
+                name='Neon Tetra', description='Schooling fish', price=Decimal('49.50'),
+                compare_at_price=Decimal('79.00'), stock=12, rating=Decimal('4.5'), is_sale=True,
+                thumbnail_url='https://example.com/neon.png',
+            ),
+            Product.objects.create(
+                name='Java Fern', description='Low light plant', price=Decimal('150.00'),
+                compare_at_price=Decimal('120.00'), stock=0, merchandising_rank=1, is_featured=True,
+            ),
+            Product.objects.create(name='Driftwood', description='', price=Decimal('300.00'), is_active=False, stock=3),
+        ]
+        products[0].categories.set([fish, plants])
+        products[0].tags.set([rare, beginner])
+        products[1].categories.set([plants])
+        products[1].tags.set([beginner])
+
+    def test_list_output_is_byte_identical(self):
+        queryset = Product.objects.order_by('pk')
+        expected = ProductListSerializer(queryset.prefetch_related('categories', 'tags'), many=True).data
+        with self.assertNumQueries(3):
+            actual = serialize_product_rows(product_values(queryset))
+        renderer = CamelCaseJSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_empty_rows(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(serialize_product_rows(product_values(Product.objects.none())), [])
+
+    def test_unexpanded_relations_collapse_to_ids(self):
+        neon = Product.objects.get(name='Neon Tetra')
+        params = {'fields': 'id,categories,tag_details', 'expand': 'categories'}
+        results = self.client.get('/api/products/', params).json()['results']
+        row = next(result for result in results if result['id'] == neon.pk)
+        self.assertEqual([category['slug'] for category in row['categories']], ['fish', 'plants'])
+        self.assertEqual(row['tagDetails'], sorted(neon.tags.values_list('pk', flat=True)))
+
+    def test_stored_cards_follow_writes(self):
+        fish = Category.objects.get(slug='fish')
+        fish.name = 'Freshwater fish'
+        fish.save()
+        neon = Product.objects.get(name='Neon Tetra')
+        neon.tags.clear()
+        Tag.objects.get(name='beginner').delete()
+        queryset = Product.objects.order_by('pk')
+        expected = ProductListSerializer(queryset.prefetch_related('categories', 'tags'), many=True).data
+        renderer = CamelCaseJSONRenderer()
+        self.assertEqual(renderer.render(stored_cards(queryset.values('id', 'card'))), renderer.render(expected))
+        self.assertFalse(queryset.filter(card__isnull=True).exists())
+
+    def test_cards_of_another_version_are_recomputed(self):
+        queryset = Product.objects.order_by('pk')
+        expected = ProductListSerializer(queryset.prefetch_related('categories', 'tags'), many=True).data
+        # e.g. written before a field was added to the list representation
+        queryset.update(card={'id': 0, CARD_VERSION_KEY: CARD_VERSION - 1})
+        renderer = CamelCaseJSONRenderer()
+        self.assertEqual(renderer.render(stored_cards(queryset.values('id', 'card'))), renderer.render(expected))
+        call_command('rebuild_product_cards', '--missing', stdout=StringIO())
+        self.assertFalse(outdated_cards(queryset).exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Planner estimates are PostgreSQL specific')
+class EstimatedCountPaginationTests(TestCase):
+    """Planner estimates are reported as ``count`` but must never decide which pages exist."""
+
+    PRODUCT_COUNT = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create(
+            Product(name=f'Product {i}', description='', price=Decimal('10.00'), stock=1) for i in range(cls.PRODUCT_COUNT)
+        )
+
+    def estimate(self, rows):
+        table = mock.patch.object(EstimatedCountPaginator, 'table_estimate', return_value=10 ** 6)
+        query = mock.patch.object(EstimatedCountPaginator, 'query_estimate', return_value=rows)
+        return table, query
+
+    def test_pages_past_an_underestimate(self):
+        table, query = self.estimate(3)
+        with table, query:
+            paginator = EstimatedCountPaginator(Product.objects.filter(stock__gt=0).order_by('pk'), 10)
+            self.assertEqual(paginator.count, 11)  # the estimate, raised to the rows seen
+            self.assertTrue(paginator.count_is_estimated)
+            pages = [paginator.page(number) for number in (1, 2, 3)]
+            self.assertEqual([len(page) for page in pages], [10, 10, 5])
+            self.assertEqual([page.has_next() for page in pages], [True, True, False])
+            self.assertEqual(pages[2].end_index(), self.PRODUCT_COUNT)
+            with self.assertRaises(EmptyPage):
+                paginator.page(4)
+
+    def test_overestimate_has_no_next_link_to_empty_pages(self):
+        table, query = self.estimate(10 ** 5)
+        with table, query:
+            paginator = EstimatedCountPaginator(Product.objects.filter(stock__gt=0).order_by('pk'), 10)
+            self.assertEqual(paginator.count, 10 ** 5)
+            self.assertFalse(paginator.page(3).has_next())
+
+    def test_single_page_results_are_counted_exactly(self):
+        table, query = self.estimate(10 ** 5)
+        with table, query:
+            paginator = EstimatedCountPaginator(Product.objects.filter(name='Product 1'), 10)
+            self.assertEqual(paginator.count, 1)
+            self.assertFalse(paginator.count_is_estimated)
+
+    def test_api_pages_past_an_underestimate(self):
+        table, query = self.estimate(3)
+        with table, query:
+            first = self.client.get('/api/products/', {'in_stock': 'true'}).json()
+            last = self.client.get('/api/products/', {'in_stock': 'true', 'page': 3}).json()
+            beyond = self.client.get('/api/products/', {'in_stock': 'true', 'page': 4})
+        self.assertTrue(first['countEstimated'])
+        self.assertIsNotNone(first['next'])
+        self.assertEqual(len(last['results']), 5)
+        self.assertIsNone(last['next'])
+        self.assertEqual(beyond.status_code, 404)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are PostgreSQL specific')
+class KeysetSeekPlanTests(TestCase):
+    """A deep keyset page must start its index scan at the cursor instead of filtering every earlier row."""
+
+    PRODUCT_COUNT = 20_000
+    PAGE_SIZE = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create(
+            (Product(name=f'Product {i}', description='', price=Decimal('10.00')) for i in range(cls.PRODUCT_COUNT)),
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_product')
+
+    def seek_queryset(self, ordering, offset):
+        queryset = Product.objects.order_by(*ordering).values('id', 'updated_at')
+        edge = queryset[offset]
+        position = [edge[name.lstrip('-')] for name in ordering]
+        return queryset.filter(KeysetPagination.seek_filter(ordering, position))[:self.PAGE_SIZE + 1]
+
+    def assertSeeks(self, queryset):
+        plan = json.loads(queryset.explain(format='json', analyze=True))[0]['Plan']
+        scans = [node for node in plan_nodes(plan) if node.get('Index Name') == 'product_updated_keyset_idx']
+        self.assertTrue(scans, 'keyset index not used')
+        self.assertIn('updated_at', scans[0].get('Index Cond', ''))
+        self.assertLessEqual(scans[0].get('Rows Removed by Filter', 0), self.PAGE_SIZE)
+
+    def test_forward_page_deep_in_the_list(self):
+        self.assertSeeks(self.seek_queryset(('-updated_at', 'id'), self.PRODUCT_COUNT * 3 // 4))
+
+    def test_backward_page_deep_in_the_list(self):
+        self.assertSeeks(self.seek_queryset(('updated_at', '-id'), self.PRODUCT_COUNT * 3 // 4))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Trigram search is PostgreSQL specific')
+class FuzzySearchTests(TestCase):
+    """Fuzzy search must reach products through indexes only, and suggest only listed products."""
+
+    PRODUCT_COUNT = 20_000
+
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create(
+            (Product(name=f'Product {i}', description='', price=Decimal('10.00')) for i in range(cls.PRODUCT_COUNT)),
+            batch_size=5000,
+        )
+        cls.tetra = Product.objects.create(name='Neon Tetra', description='', price=Decimal('49.50'))
+        cls.fern = Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'))
+        cls.fern.tags.add(Tag.objects.create(name='tetrasafe'))
+        cls.shrimp = Product.objects.create(name='Amano Shrimp', description='', price=Decimal('80.00'))
+        cls.shrimp.categories.add(Category.objects.create(name='Tetras', slug='tetras'))
+        Product.objects.create(name='Cardinal Tetrax', description='', price=Decimal('60.00'), is_active=False)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_product, core_tag, core_category')
+
+    def test_matches_names_tags_and_categories(self):
+        found = set(fuzzy_search_products(Product.objects.all(), 'tetra').values_list('pk', flat=True))
+        self.assertTrue({self.tetra.pk, self.fern.pk, self.shrimp.pk} <= found)
+
+    def test_no_sequential_scan_of_products(self):
+        with transaction.atomic():
+            _set_trigram_threshold(settings.FUZZY_SEARCH_THRESHOLD)
+            queryset = Product.objects.filter(fuzzy_match('tetra'))
+            plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        seq_scans = [node for node in plan_nodes(plan) if node['Node Type'] == 'Seq Scan']
+        self.assertNotIn('core_product', [node.get('Relation Name') for node in seq_scans])
+
+    def test_suggestions_skip_inactive_products(self):
+        self.assertNotIn('Cardinal Tetrax', suggest_terms('Cardinal Tetra'))
+
+
+class PrefixIndexTests(SimpleTestCase):
+    """Bounded per-node rankings must always agree with a full sort of the node's entries."""
+
+    def expected(self, index, query, limit):
+        tokens = tokenize(query)
+        keys = [
+            key for key, (label, popularity, entry_tokens) in index.entries.items()
+            if all(any(token.startswith(prefix) for token in entry_tokens) for prefix in tokens)
+        ]
+        keys.sort(key=lambda key: (-index.entries[key][1], index.entries[key][0], key))
+        return [key[1] for key in keys[:limit]]
+
+    def test_rankings_follow_random_updates(self):
+        words = ['neon', 'tetra', 'java', 'fern', 'new', 'net', 'fish', 'filter']
+        rng = random.Random(7)
+        index = PrefixIndex(top_k=4)
+        for step in range(3000):
+            key = ('product', rng.randint(1, 40))
+            roll = rng.random()
+            if roll < 0.4:
+                index.add(key, f'{" ".join(rng.sample(words, 2))} {key[1]}', rng.randint(0, 20))
+            elif roll < 0.8:
+                index.adjust_popularity(key, rng.randint(-3, 3))
+            else:
+                index.remove(key)
+            for query in ('n', 'ne', 'fi', 'neon t', 'f n'):
+                self.assertEqual([hit['id'] for hit in index.search(query, 3)], self.expected(index, query, 3))
+
+    def test_popularity_bump_moves_entry_in_place(self):
+        index = PrefixIndex(top_k=2)
+        for pk in range(1, 6):
+            index.add(('product', pk), f'neon {pk}', pk)
+        index.adjust_popularity(('product', 1), 10)
+        self.assertEqual(index._node('n').top[0][2], ('product', 1))
+        self.assertFalse(index._node('n').stale)
+
+
+class AutocompleteIndexTests(TestCase):
+    def setUp(self):
+        self.autocomplete = AutocompleteIndex()
+        self.autocomplete.build()
+        patcher = mock.patch('core.signals.autocomplete_index', self.autocomplete)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def labels(self, query):
+        return [hit['label'] for hit in self.autocomplete.search(query)]
+
+    def test_updates_wait_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Product.objects.create(name='Neon Tetra', description='', price=Decimal('49.50'))
+        self.assertEqual(self.labels('neo'), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.labels('neo'), ['Neon Tetra'])
+
+    def test_endpoint_matches_every_token_prefix(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ('Neon Tetra', 'Cardinal Tetra', 'Neon Rainbowfish'):
+                Product.objects.create(name=name, description='', price=Decimal('49.50'))
+        with mock.patch('core.views.autocomplete_index', self.autocomplete):
+            results = self.client.get('/api/products/autocomplete/', {'q': 'neo tet'}).json()['results']
+            limited = self.client.get('/api/products/autocomplete/', {'q': 'tetra', 'limit': 1}).json()['results']
+        self.assertEqual([hit['label'] for hit in results], ['Neon Tetra'])
+        self.assertEqual(len(limited), 1)
+
+    def test_writes_during_rebuild_are_replayed(self):
+        build_products = Product.objects.filter
+
+        def write_mid_build(*args, **kwargs):
+            # Committed after the rebuild started reading
+            self.autocomplete.add('product', 999, 'Java Fern')
+            return build_products(*args, **kwargs)
+
+        with mock.patch('core.autocomplete.Product.objects.filter', side_effect=write_mid_build):
+            self.autocomplete.build()
+        self.assertEqual(self.labels('jav'), ['Java Fern'])
+
+
+class SearchVectorTests(TestCase):
+    """Tag and category names are searchable exactly while they are linked."""
+
+    def setUp(self):
+        self.product = Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'))
+        self.tag = Tag.objects.create(name='epiphyte')
+        self.category = Category.objects.create(name='Rhizome plants', slug='rhizome-plants')
+        self.product.tags.add(self.tag)
+        self.product.categories.add(self.category)
+
+    def found(self, query):
+        return list(search_products(Product.objects.all(), query, expand_synonyms=False).values_list('pk', flat=True))
+
+    def test_deleted_tag_and_category_names_are_not_searchable(self):
+        self.assertEqual(self.found('epiphyte'), [self.product.pk])
+        self.assertEqual(self.found('rhizome'), [self.product.pk])
+        self.tag.delete()
+        self.category.delete()
+        self.assertEqual(self.found('epiphyte'), [])
+        self.assertEqual(self.found('rhizome'), [])
+
+
+class CatalogCacheOutageTests(TestCase):
+    """Without Redis the catalog is served uncached instead of failing."""
+
+    def setUp(self):
+        Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'), stock=3)
+        backend = caches[settings.CATALOG_CACHE_ALIAS]
+        for method in ('get', 'get_many', 'set', 'set_many', 'add', 'incr', 'delete_many'):
+            patcher = mock.patch.object(backend, method, side_effect=ConnectionInterrupted(connection=None))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('core.cache.get_redis_connection', side_effect=RedisConnectionError('down'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lists_and_facets_are_served_uncached(self):
+        response = self.client.get('/api/products/', {'facets': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['name'] for product in response.json()['results']], ['Java Fern'])
+        self.assertNotIn('ETag', response)
+
+    def test_version_bump_is_a_no_op(self):
+        self.assertIsNone(bump_catalog_version())
+
+
+class CatalogVersionScopeTests(TestCase):
+    """Only writes that can change which products a list contains retire the cached lists."""
+
+    def setUp(self):
+        Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'), stock=3)
+        self.product = Product.objects.get(name='Java Fern')
+
+    def bumps(self, save):
+        with mock.patch('core.signals.bump_catalog_version') as catalog, \
+                mock.patch('core.signals.bump_stock_version') as stock:
+            with self.captureOnCommitCallbacks(execute=True):
+                save()
+        return catalog.call_count, stock.call_count
+
+    def test_stock_only_save_bumps_the_stock_version(self):
+        self.product.stock = 2
+        self.assertEqual(self.bumps(lambda: self.product.save(update_fields=['stock', 'updated_at'])), (0, 1))
+
+    def test_selling_out_bumps_the_catalog_version(self):
+        self.product.stock = 0
+        self.assertEqual(self.bumps(self.product.save), (1, 0))
+
+    def test_listed_field_change_bumps_the_catalog_version(self):
+        self.product.stock = 5
+        self.product.price = Decimal('120.00')
+        self.assertEqual(self.bumps(self.product.save), (1, 0))
+
+
+class ActiveProductsOnly(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return obj.is_active
+
+
+class CachedProductRetrieveTests(TestCase):
+    """The cached product page runs the object permission checks get_object() would."""
+
+    def setUp(self):
+        self.active = Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'))
+        self.inactive = Product.objects.create(name='Anubias', description='', price=Decimal('90.00'), is_active=False)
+        patcher = mock.patch.object(ProductViewSet, 'permission_classes', [ActiveProductsOnly])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_object_permissions_apply_to_cached_products(self):
+        self.assertEqual(self.client.get(f'/api/products/{self.active.pk}/').status_code, 200)
+        self.assertIn(self.client.get(f'/api/products/{self.inactive.pk}/').status_code, (401, 403))
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    BODY = {'results': [{'name': f'Product {i}', 'description': 'Schooling fish'} for i in range(100)]}
+
+    def respond(self, response, accept='gzip, br'):
+        middleware = CompressionMiddleware(lambda request: response)
+        middleware.variant_cache = mock.Mock(get=mock.Mock(return_value=None))
+        return middleware(APIRequestFactory().get('/api/products/', HTTP_ACCEPT_ENCODING=accept))
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate_encoding('br;q=0, gzip;q=0.5'), 'gzip')
+        self.assertEqual(negotiate_encoding('deflate, br', offered=('gzip',)), None)
+        self.assertEqual(negotiate_encoding('*;q=0.1', offered=('gzip',)), 'gzip')
+        self.assertIsNone(negotiate_encoding('identity'))
+
+    def test_shared_response_is_compressed_with_a_weak_etag(self):
+        response = JsonResponse(self.BODY)
+        response['ETag'] = '"catalog"'
+        response = self.respond(response, accept='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"catalog"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.BODY)
+
+    def test_private_response_is_gzipped_with_random_padding(self):
+        sizes = set()
+        for _ in range(10):
+            response = self.respond(JsonResponse(self.BODY), accept='br, gzip;q=0.5')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(json.loads(gzip.decompress(response.content)), self.BODY)
+            sizes.add(len(response.content))
+        self.assertGreater(len(sizes), 1)
+
+    def test_not_modified_carries_vary_and_the_weak_etag(self):
+        response = HttpResponseNotModified()
+        response['ETag'] = '"catalog"'
+        response = self.respond(response)
+        self.assertEqual(response['ETag'], 'W/"catalog"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_exempt_small_and_non_json_responses_are_untouched(self):
+        exempt = compression_exempt(lambda request: JsonResponse(self.BODY))(None)
+        for response in (exempt, JsonResponse({'ok': True}), HttpResponse('x' * 5000, content_type='text/plain')):
+            response = self.respond(response)
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertFalse(response.has_header('Vary'))
+
+
+class CamelCaseTests(SimpleTestCase):
+    """API payloads are camelCase on the wire and snake_case in Python."""
+
+    def test_parser_converts_nested_keys_to_snake_case(self):
+        body = b'{"shippingAddress": {"addressLine1": "1 Reef Rd", "isDefault": true}, "items": [{"productId": 7}]}'
+        self.assertEqual(CamelCaseJSONParser().parse(BytesIO(body)), {
+            'shipping_address': {'address_line_1': '1 Reef Rd', 'is_default': True},
+            'items': [{'product_id': 7}],
+        })
+
+    def test_renderer_converts_nested_keys_to_camel_case(self):
+        data = {'compare_at_price': '9.00', 'tag_details': [{'created_at': None}], 'address_line_1': 'x'}
+        self.assertEqual(
+            json.loads(CamelCaseJSONRenderer().render(data)),
+            {'compareAtPrice': '9.00', 'tagDetails': [{'createdAt': None}], 'addressLine1': 'x'},
+        )
+
+    def test_middleware_converts_plain_json_responses(self):
+        middleware = CamelSnakeCaseMiddleware(lambda request: JsonResponse({'full_name': 'Ann', 'is_admin': False}))
+        response = middleware(APIRequestFactory().get('/api/auth/me/'))
+        self.assertEqual(json.loads(response.content), {'fullName': 'Ann', 'isAdmin': False})
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+
+
+class KeyTranslatorTests(SimpleTestCase):
+    def test_tables_agree_with_the_fallback_conversion(self):
+        names = ['compare_at_price', 'address_line_1', 'is_in_stock', 'id']
+        translator = KeyTranslator()
+        translator.register(names)
+        for name in names:
+            self.assertEqual(translator.to_camel(name), snake_to_camel(name))
+            self.assertEqual(translator.to_snake(translator.to_camel(name)), camel_to_snake(snake_to_camel(name)))
+        self.assertEqual(translator.stats()['misses'], 0)
+
+    def test_unknown_keys_fall_back_through_a_bounded_cache(self):
+        translator = KeyTranslator(maxsize=2)
+        for key in ('first_key', 'second_key', 'third_key', 'third_key'):
+            self.assertEqual(translator.to_camel(key), snake_to_camel(key))
+        stats = translator.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 4))
+        self.assertEqual(stats['to_camel_cache']['currsize'], 2)
+        self.assertEqual(stats['to_camel_cache']['hits'], 1)
+
+
+class StreamingListTests(TestCase):
+    def test_json_array_is_flushed_in_batches(self):
+        rows = [{'row_number': i} for i in range(250)]
+        chunks = list(iter_json_array(iter(rows), batch_size=100))
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(json.loads(b''.join(chunks)), [{'rowNumber': i} for i in range(250)])
+        self.assertEqual(json.loads(b''.join(iter_json_array(iter([])))), [])
+
+    def test_category_collection_is_streamed(self):
+        plants = Category.objects.create(name='Plants', slug='plants')
+        for name in ('Java Fern', 'Anubias'):
+            Product.objects.create(name=name, description='', price=Decimal('90.00')).categories.add(plants)
+        Product.objects.create(name='Neon Tetra', description='', price=Decimal('49.50'))
+        response = self.client.get('/api/products/category/plants/')
+        self.assertTrue(response.streaming)
+        names = [product['name'] for product in json.loads(b''.join(response.streaming_content))]
+        self.assertEqual(sorted(names), ['Anubias', 'Java Fern'])
+
+
+class SynonymExpansionTests(TestCase):
+    def test_longest_phrase_is_replaced_one_at_a_time(self):
+        table = {'max_words': 2, 'terms': {
+            'neon tetra': ['paracheirodon innesi'], 'neon': ['neon light'], 'school': ['shoal'],
+        }}
+        with mock.patch('core.synonyms.get_synonym_table', return_value=table):
+            self.assertEqual(expand_query('Neon  Tetra school'), [
+                'neon tetra school', 'paracheirodon innesi school', 'neon tetra shoal',
+            ])
+            self.assertEqual(expand_query('java fern'), ['java fern'])
+
+    def test_table_is_invalidated_after_commit(self):
+        with mock.patch('core.signals.invalidate_synonym_table') as invalidate:
+            with self.captureOnCommitCallbacks() as callbacks:
+                SynonymGroup.objects.create(terms='java fern, microsorum pteropus')
+            invalidate.assert_not_called()
+            for callback in callbacks:
+                callback()
+            invalidate.assert_called_once_with()
+
+    def test_table_is_compiled_uncached_without_redis(self):
+        SynonymGroup.objects.create(terms='java fern, microsorum pteropus')
+        with mock.patch('core.synonyms.cache') as cache:
+            cache.get.side_effect = ConnectionInterrupted(connection=None)
+            self.assertEqual(expand_query('java fern'), ['java fern', 'microsorum pteropus'])
+
+    def test_search_matches_a_synonym(self):
+        neon = Product.objects.create(name='Neon Tetra', description='Schooling fish', price=Decimal('49.50'))
+        with self.captureOnCommitCallbacks(execute=True):
+            SynonymGroup.objects.create(terms='neon tetra, Paracheirodon innesi')
+        found = search_products(Product.objects.all(), 'paracheirodon innesi')
+        self.assertEqual(list(found.values_list('pk', flat=True)), [neon.pk])
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.plants = Category.objects.create(name='Plants', slug='plants')
+        cls.rare = Tag.objects.create(name='rare')
+        fern = Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'), stock=2, is_sale=True)
+        fern.categories.add(cls.plants)
+        fern.tags.add(cls.rare)
+        Product.objects.create(name='Anubias', description='', price=Decimal('90.00'), stock=0).categories.add(cls.plants)
+        Product.objects.create(name='Neon Tetra', description='', price=Decimal('49.50'), stock=5, is_active=False)
+
+    def test_counts_follow_the_filtered_set(self):
+        facets = compute_facets(Product.objects.filter(categories=self.plants))
+        self.assertEqual((facets['total'], facets['in_stock']), (2, 1))
+        self.assertEqual(facets['flags']['is_sale'], 1)
+        self.assertEqual(facets['categories'], [{'id': self.plants.pk, 'name': 'Plants', 'slug': 'plants', 'count': 2}])
+        self.assertEqual(facets['tags'], [{'id': self.rare.pk, 'name': 'rare', 'count': 1}])
+        self.assertEqual(sum(bucket['count'] for bucket in facets['price']), 2)
+
+    def test_cache_key_ignores_paging_and_ordering(self):
+        key = facets_cache_key(QueryDict('category=plants&in_stock=true'))
+        self.assertEqual(facets_cache_key(QueryDict('in_stock=true&page=3&ordering=price&category=plants')), key)
+        self.assertNotEqual(facets_cache_key(QueryDict('category=fish&in_stock=true')), key)
+
+    def test_list_response_embeds_facets(self):
+        data = self.client.get('/api/products/', {'facets': 'true', 'is_sale': 'true'}).json()
+        self.assertEqual(data['facets']['total'], 1)
+        self.assertEqual(data['facets']['inStock'], 1)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages cover every row exactly once, in both directions, across ties in the leading column."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create(
+            Product(name=f'Product {i}', description='', price=Decimal('10.00')) for i in range(11)
+        )
+        # Ties on updated_at are broken by id
+        Product.objects.filter(name__in=['Product 2', 'Product 3', 'Product 4', 'Product 5']).update(
+            updated_at=timezone.now()
+        )
+        cls.expected = list(Product.objects.order_by('-updated_at', 'id').values_list('pk', flat=True))
+
+    def walk(self, url, params=None, link='next'):
+        pages = []
+        while url:
+            data = self.client.get(url, params).json()
+            params = None
+            pages.append([product['id'] for product in data['results']])
+            url = data[link]
+        return pages
+
+    def test_next_links_cover_every_row_once(self):
+        pages = self.walk('/api/products/', {'cursor': '', 'page_size': 4})
+        self.assertEqual([len(page) for page in pages], [4, 4, 3])
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_previous_links_walk_back(self):
+        data = self.client.get('/api/products/', {'cursor': '', 'page_size': 4}).json()
+        self.assertIsNone(data['previous'])
+        second = self.client.get(data['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual([product['id'] for product in back['results']], self.expected[:4])
+        self.assertIsNone(back['previous'])
+
+        while second['next']:
+            second = self.client.get(second['next']).json()
+        pages = self.walk(second['previous'], link='previous')
+        self.assertEqual(sum(reversed(pages), []), self.expected[:8])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/products/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class MerchandisingCollectionTests(TestCase):
+    """Collections are read from Redis sorted sets: manual ranks first, then the most recently updated."""
+
+    def setUp(self):
+        now = timezone.now()
+        self.products = {}
+        for name, rank, age in (('Java Fern', None, 1), ('Anubias', 2, 3), ('Neon Tetra', None, 0), ('Driftwood', 1, 2)):
+            product = Product.objects.create(name=name, description='', price=Decimal('10.00'), is_featured=True,
+                                             merchandising_rank=rank)
+            Product.objects.filter(pk=product.pk).update(updated_at=now - timedelta(days=age))
+            self.products[name] = product.pk
+        Product.objects.create(name='Gravel', description='', price=Decimal('5.00'))
+        rebuild_collection('featured')
+        self.expected = [self.products[name] for name in ('Driftwood', 'Anubias', 'Neon Tetra', 'Java Fern')]
+
+    def test_scores(self):
+        updated_at = timezone.now()
+        self.assertGreater(product_score(1, updated_at), product_score(2, updated_at))
+        self.assertGreater(product_score(2, updated_at), product_score(None, updated_at))
+
+    def test_collection_slices_like_a_sequence(self):
+        collection = MerchandisingCollection('featured')
+        self.assertEqual(len(collection), 4)
+        self.assertEqual(collection[:], self.expected)
+        self.assertEqual(collection[1:3], self.expected[1:3])
+        self.assertEqual(collection[0], self.expected[0])
+        self.assertEqual(collection[3:3], [])
+
+    def test_endpoint_pages_and_streams_the_collection(self):
+        page = self.client.get('/api/products/featured/', {'page': 2, 'page_size': 2}).json()
+        self.assertEqual(page['count'], 4)
+        self.assertEqual([product['id'] for product in page['results']], self.expected[2:])
+        response = self.client.get('/api/products/featured/')
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([product['id'] for product in streamed], self.expected)
+
+    def test_redis_outage_falls_back_to_sql(self):
+        with mock.patch('core.views.MerchandisingCollection', side_effect=RedisError('down')):
+            response = self.client.get('/api/products/featured/')
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(sorted(product['id'] for product in streamed), sorted(self.expected))
+
+
+class CategoryCatalogTests(TestCase):
+    def setUp(self):
+        self.plants = Category.objects.create(name='Plants', slug='plants')
+        self.fish = Category.objects.create(name='Fish', slug='fish')
+        self.fern = Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'), stock=2)
+        for product in (
+            self.fern,
+            Product.objects.create(name='Anubias', description='', price=Decimal('90.00'), stock=0),
+            Product.objects.create(name='Moss', description='', price=Decimal('40.00'), stock=4, is_active=False),
+        ):
+            product.categories.add(self.plants)
+
+    def counts(self):
+        results = self.client.get('/api/categories/').json()['results']
+        return {category['slug']: category['productCount'] for category in results}
+
+    def test_counts_only_active_in_stock_products(self):
+        catalog = build_category_catalog()
+        self.assertEqual([(category['slug'], category['product_count']) for category in catalog],
+                         [('fish', 0), ('plants', 1)])
+
+    def test_ordering_is_applied_to_the_catalog(self):
+        Category.objects.create(name='Driftwood', slug='wood', description='Hardscape')
+        results = self.client.get('/api/categories/', {'ordering': '-description,name'}).json()['results']
+        self.assertEqual([category['slug'] for category in results], ['fish', 'plants', 'wood'])
+        results = self.client.get('/api/categories/', {'ordering': '-slug'}).json()['results']
+        self.assertEqual([category['slug'] for category in results], ['wood', 'plants', 'fish'])
+        # Unknown fields are ignored, as by OrderingFilter
+        results = self.client.get('/api/categories/', {'ordering': 'password'}).json()['results']
+        self.assertEqual([category['slug'] for category in results], ['wood', 'fish', 'plants'])
+
+    def test_selling_out_retires_the_cached_catalog(self):
+        self.assertEqual(self.counts(), {'fish': 0, 'plants': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fern.stock = 0
+            self.fern.save()
+        self.assertEqual(self.counts(), {'fish': 0, 'plants': 0})
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.remote = LocMemCache('tiered-tests', {})
+        self.remote.clear()
+        self.cache = TieredCache(None, {'OPTIONS': {'CHANNEL': 'tiered-tests', 'MAX_ENTRIES': 2, 'LOCAL_TIMEOUT': 30}})
+        self.cache.tier.lru.clear()
+        for patcher in (
+            mock.patch.object(TieredCache, 'remote', self.remote),
+            mock.patch.object(self.cache.tier, 'ensure_listener'),
+            mock.patch.object(self.cache.tier, 'publish'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_lru_is_bounded_expires_and_copies(self):
+        lru = LocalLRU(max_entries=2)
+        value = {'names': ['Java Fern']}
+        lru.set('a', value, ttl=30)
+        lru.set('b', 2, ttl=0)
+        value['names'].append('Anubias')
+        self.assertEqual(lru.get('a'), {'names': ['Java Fern']})
+        self.assertIs(lru.get('b'), MISSING)  # expired
+        lru.set('c', 3, ttl=30)
+        lru.get('a')
+        lru.set('d', 4, ttl=30)
+        self.assertIs(lru.get('c'), MISSING)  # least recently used
+        self.assertEqual(len(lru), 2)
+
+    def test_remote_hits_are_kept_locally(self):
+        self.remote.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.remote.delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.stats()['local']['hits'], 1)
+
+    def test_set_many_accepts_a_backend_returning_none(self):
+        # As django-redis does
+        with mock.patch.object(self.remote, 'set_many', return_value=None):
+            self.assertEqual(self.cache.set_many({'a': 1, 'b': 2}), [])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {'a': 1, 'b': 2})
+
+    def test_writes_are_broadcast_and_evicted_elsewhere(self):
+        self.cache.set('key', 'value')
+        local_key = self.cache.make_and_validate_key('key')
+        self.cache.tier.publish.assert_called_once_with([local_key])
+
+        self.cache.tier.on_message(json.dumps({'sender': self.cache.tier.sender, 'keys': [local_key]}))
+        self.assertEqual(self.cache.local.get(local_key), 'value')  # our own broadcast
+        self.cache.tier.on_message(json.dumps({'sender': 'another-worker', 'keys': [local_key]}))
+        self.assertIs(self.cache.local.get(local_key), MISSING)
+        self.assertEqual(self.cache.get('key'), 'value')  # still in the shared tier
+
+
+class GetOrComputeTests(SimpleTestCase):
+    """Only the lock holder recomputes; everyone else is served what is there."""
+
+    def setUp(self):
+        self.cache = LocMemCache('get-or-compute-tests', {})
+        self.cache.clear()
+        self.leader = True
+        patcher = mock.patch('core.cache.catalog_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        @contextmanager
+        def single_flight(name):
+            yield self.leader
+
+        patcher = mock.patch('core.cache.single_flight', single_flight)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, compute=lambda: 'fresh', stamp=None):
+        return get_or_compute('key', compute, 60, 'tests', stamp=stamp)
+
+    def test_miss_then_hit(self):
+        self.assertEqual(self.get(), ('fresh', 'miss'))
+        self.assertEqual(self.get(lambda: self.fail('recomputed a fresh entry')), ('fresh', 'hit'))
+
+    def test_expired_entry_is_served_stale_while_another_worker_refreshes(self):
+        self.cache.set('key', cache_entry('old', timeout=-1))
+        self.leader = False
+        self.assertEqual(self.get(), ('old', 'stale'))
+        self.leader = True
+        self.assertEqual(self.get(), ('fresh', 'early_refresh'))
+
+    def test_slow_values_are_refreshed_early(self):
+        entry = cache_entry('old', timeout=1, compute_time=60)
+        self.cache.set('key', entry)
+        self.assertEqual(self.get(), ('fresh', 'early_refresh'))
+
+    def test_entry_of_another_stamp_is_refreshed(self):
+        self.assertEqual(self.get(stamp=1), ('fresh', 'miss'))
+        self.assertEqual(self.get(lambda: 'restocked', stamp=2), ('restocked', 'early_refresh'))
+        self.assertEqual(self.get(stamp=2), ('restocked', 'hit'))
+
+    @override_settings(CACHE_LOCK_WAIT=1)
+    def test_cold_miss_waits_for_the_leader(self):
+        self.leader = False
+        get = self.cache.get
+        with mock.patch.object(self.cache, 'get', side_effect=[None, cache_entry('built', 60)]):
+            started = time.monotonic()
+            self.assertEqual(self.get(lambda: self.fail('computed twice')), ('built', 'hit'))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertIsNone(get('key'))
+
+
+class ConditionalGetTests(TestCase):
+    """Catalog GETs revalidate with 304 until a catalog write moves the version on."""
+
+    def setUp(self):
+        self.product = Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'), stock=3)
+        self.url = f'/api/products/{self.product.pk}/'
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        # A weak validator (as sent after compression) matches too
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/api/products/')['Last-Modified']
+        response = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_the_query_string(self):
+        first = self.client.get('/api/products/', {'page': 1})['ETag']
+        self.assertNotEqual(self.client.get('/api/products/', {'page': 2, 'page_size': 1})['ETag'], first)
+
+    def test_catalog_write_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('120.00')
+            self.product.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['price'], '120.00')
+
+    def test_stock_change_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock = 2
+            self.product.save(update_fields=['stock', 'updated_at'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['stock'], 2)
+
+
+class FieldSelectionTests(SimpleTestCase):
+    def test_paths_become_a_tree(self):
+        self.assertEqual(parse_paths('id, items.quantity,items.product.name,'), {
+            'id': {}, 'items': {'quantity': {}, 'product': {'name': {}}},
+        })
+
+    def test_trim_selects_and_collapses(self):
+        data = {'id': 1, 'name': 'Java Fern', 'categories': [{'id': 3, 'name': 'Plants'}],
+                'tag_details': [{'id': 5, 'name': 'rare'}]}
+        selection = FieldSelection.from_query_params(QueryDict('fields=id,categories.name,tag_details&expand=categories'))
+        self.assertEqual(selection.trim(data), {'id': 1, 'categories': [{'name': 'Plants'}], 'tag_details': [5]})
+        self.assertIsNone(FieldSelection.from_query_params(QueryDict('page=2')))
+
+    def test_queryset_loads_only_the_selected_columns(self):
+        selection = FieldSelection(parse_paths('id,status,items.quantity'), parse_paths('items'))
+        serializer = OrderSerializer(context={'field_selection': selection})
+        queryset = narrow_queryset(Order.objects.all(), serializer)
+        columns, defer = queryset.query.deferred_loading
+        self.assertFalse(defer)
+        self.assertEqual(set(columns), {'id', 'status'})
+        (items,) = queryset._prefetch_related_lookups
+        self.assertEqual(items.prefetch_to, 'items')
+        self.assertEqual(set(items.queryset.query.deferred_loading[0]), {'id', 'quantity', 'order_id'})
+
+
+class SparseFieldsApiTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Java Fern', description='Low light plant', price=Decimal('150.00'))
+        self.product.tags.add(Tag.objects.create(name='rare'))
+
+    def test_detail_renders_only_the_selected_fields(self):
+        data = self.client.get(f'/api/products/{self.product.pk}/', {'fields': 'id,name,tag_details', 'expand': ''}).json()
+        self.assertEqual(data, {'id': self.product.pk, 'name': 'Java Fern',
+                                'tagDetails': list(self.product.tags.values_list('pk', flat=True))})
+
+    def test_list_renders_only_the_selected_fields(self):
+        results = self.client.get('/api/products/', {'fields': 'id,price'}).json()['results']
+        self.assertEqual(results, [{'id': self.product.pk, 'price': '150.00'}])
+
+
+class ProductWriteThroughTests(TestCase):
+    def test_cache_failures_do_not_fail_the_write(self):
+        product = Product.objects.create(name='Java Fern', description='', price=Decimal('150.00'))
+        with mock.patch('core.product_cache.catalog_cache') as cache:
+            cache.set_many.side_effect = TypeError('argument of type NoneType is not iterable')
+            refresh_products([product.pk])
+            with self.captureOnCommitCallbacks(execute=True):
+                product.stock = 4
+                product.save()
+        cache.delete_many.assert_called()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'index_usage reads PostgreSQL statistics views')
+class IndexUsageCommandTests(TestCase):
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('index_usage', *args, stdout=out, no_color=True)
+        return out.getvalue().splitlines()
+
+    def test_reports_the_catalog_indexes(self):
+        lines = self.run_command('--table', 'core_product%')
+        self.assertTrue(lines[0].startswith('Statistics collected since: '))
+        self.assertEqual(lines[1].split(), ['table', 'index', 'scans', 'tuples', 'read', 'tuples', 'fetched', 'size'])
+        rows = {line.split()[1]: line.split() for line in lines[2:-1]}
+        for name in ('product_featured_idx', 'product_price_idx', 'product_active_stock_idx',
+                     'product_categories_reverse_idx', 'product_tags_reverse_idx'):
+            self.assertIn(name, rows)
+        table, index, scans, read, fetched, size, unit = rows['product_price_idx']
+        self.assertEqual(table, 'core_product')
+        self.assertTrue(scans.isdigit() and read.isdigit() and fetched.isdigit())
+        self.assertIn(unit, ('B', 'kB', 'MB', 'GB'))
+        self.assertRegex(lines[-1], r'^(\d+ non-unique index\(es\) never scanned: |Every non-unique index has been scanned)')
+
+    def test_unused_lists_only_unscanned_indexes(self):
+        lines = self.run_command('--table', 'core_product%', '--unused')
+        self.assertTrue(all(line.split()[2] == '0' for line in lines[2:-1]))
+
+    def test_human_size(self):
+        self.assertEqual([human_size(size) for size in (512, 8192, 3 * 1024 ** 2)], ['512 B', '8 kB', '3 MB'])
+
+
+class CompiledSerializerTests(TestCase):
+    """Compiled plans must render exactly what DRF's own to_representation renders."""
+
+    @classmethod
+    def setUpTestData(cls):
+        plants = Category.objects.create(name='Plants', slug='plants', description='Live plants')
+        rare = Tag.objects.create(name='rare')
+        fern = Product.objects.create(
+            name='Java Fern', description='Low light plant', price=Decimal('150.00'), compare_at_price=Decimal('180.00'),
+            stock=3, rating=Decimal('4.5'), is_featured=True, merchandising_rank=1, image_url='https://example.com/f.png',
+        )
+        fern.categories.add(plants)
+        fern.tags.add(rare)
+        ProductImage.objects.create(product=fern, image_url='https://example.com/f2.png', order=1)
+        Product.objects.create(name='Driftwood', description='', price=Decimal('300.00'), is_active=False)
+
+    def drf_data(self, serializer_class, instances, **kwargs):
+        serializer_compiler.enabled = False
+        try:
+            return serializer_class(instances, many=True, **kwargs).data
+        finally:
+            serializer_compiler.enabled = True
+
+    def assertSameOutput(self, serializer_class, queryset, **kwargs):
+        instances = list(queryset)
+        renderer = CamelCaseJSONRenderer()
+        compiled = serializer_class(instances, many=True, **kwargs).data
+        self.assertEqual(renderer.render(compiled), renderer.render(self.drf_data(serializer_class, instances, **kwargs)))
+
+    def test_product_serializers(self):
+        queryset = Product.objects.order_by('pk').prefetch_related('categories', 'tags', 'images')
+        for serializer_class in (ProductSerializer, ProductDetailSerializer, ProductListSerializer):
+            with self.subTest(serializer_class.__name__):
+                self.assertSameOutput(serializer_class, queryset)
+        # Unprefetched relations are loaded the way DRF loads them
+        self.assertSameOutput(ProductSerializer, Product.objects.order_by('pk'))
+
+    def test_trimmed_selection(self):
+        selection = FieldSelection(parse_paths('id,name,price,tag_details,images'), parse_paths('images'))
+        queryset = Product.objects.order_by('pk').prefetch_related('tags', 'images')
+        self.assertSameOutput(ProductDetailSerializer, queryset, context={'field_selection': selection})
+
+    def test_plan_is_compiled_once(self):
+        plan = compile_plan(ProductSerializer)
+        self.assertEqual([entry[0] for entry in plan.entries],
+                         [name for name, field in ProductSerializer().fields.items() if not field.write_only])
+        self.assertIs(serializer_compiler.plan(ProductSerializer), serializer_compiler.plan(ProductSerializer))
+
+    def test_benchmark_reports_identical_output(self):
+        out = StringIO()
+        call_command('benchmark_serializers', '--rows', '5', '--repeat', '1', stdout=out, no_color=True)
+        self.assertNotIn('Compiled output differs', out.getvalue())
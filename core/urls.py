@@ -3,7 +3,7 @@ from rest_framework.routers import SimpleRouter
 
 from .views import (
     ProductViewSet, CategoryViewSet, OrderViewSet,
-    ContactView, StockNotificationSubscribeView,
+    CacheStatsView, ContactView, StockNotificationSubscribeView,
     StockNotificationNotifyView, UserAdminViewSet, TagViewSet, ShippingAddressViewSet, AppNotificationViewSet
 )
 
@@ -46,6 +46,7 @@ router.register(r'app_notifications', AppNotificationViewSet, basename='app_noti
 urlpatterns = [
     path('', include(router.urls)),
     re_path(r'^contact/?$', ContactView.as_view(), name='contact'),
+    re_path(r'^cache-stats/?$', CacheStatsView.as_view(), name='cache_stats'),
     re_path(r'^stock-notifications/subscribe/?$', StockNotificationSubscribeView.as_view(), name='stock_subscribe'),
     re_path(r'^stock-notifications/notify/?$', StockNotificationNotifyView.as_view(), name='stock_notify'),
 ]
@@ -1,25 +1,43 @@
 from django.db.models import Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.cache import caches
+from django.utils.decorators import method_decorator
 from django.utils.timezone import now
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, filters, generics, status
+from rest_framework import viewsets, generics, status
 from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.core.mail import send_mail, EmailMessage
+from redis.exceptions import RedisError
 import logging
 
-from .filters import ProductFilter
+from aquaticexotica_backend.pagination import (CursorOptInPagination, EstimatedCountPagination,
+                                              StandardResultsSetPagination)
+from aquaticexotica_backend.streaming import StreamingJSONResponse, StreamingListMixin
+from .autocomplete import autocomplete_index
+from .cache import CachedListMixin, cache_metrics
+from .category_catalog import get_category_catalog
+from .conditional import catalog_condition, catalog_view_condition
+from .facets import get_facets
+from .filters import ProductFilter, ProductSearchFilter
+from .merchandising import COLLECTIONS, MerchandisingCollection
 from .models import (Product, Order, Category, Cart, CartItem, OrderItem, ShippingAddress, StockNotification, Tag,
                      AppNotification, NotificationType)
 from .permissions import IsAdminOrReadOnly, RoleBasedSafeWritePermission
+from .product_cache import get_product_cards, get_product_detail
+from .product_rows import ProductRowsMixin
+from .search import search_products, fuzzy_search_products, suggest_terms
 from .serializers import (UserSerializer, ProductSerializer, OrderSerializer, CategorySerializer, CartSerializer,
                           CartItemSerializer, OrderItemSerializer, ShippingAddressSerializer,
                           StockNotificationSerializer, TagSerializer, ProductDetailSerializer, ProductListSerializer,
                           AppNotificationSerializer)
+from .sparse_fields import SparseFieldsMixin
 
 logger = logging.getLogger('core')
 
@@ -50,14 +68,18 @@ class UserAdminViewSet(viewsets.ModelViewSet):
         return Response({'detail': f'Admin rights revoked for {user.username}.'}, status=status.HTTP_200_OK)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseFieldsMixin, CachedListMixin, ProductRowsMixin, StreamingListMixin, viewsets.ModelViewSet):
     """Product endpoints (admin & public)."""
 
+    stream_actions = ("featured", "trending", "new", "sale", "category")
+    row_actions = ("list", "featured", "trending", "new", "sale", "category")
+    list_cache_timeout = settings.PRODUCT_LIST_CACHE_TIMEOUT
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ("-updated_at", "id")
     queryset = Product.objects.all().order_by('-updated_at')
     permission_classes = [RoleBasedSafeWritePermission]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    filter_backends = [ProductSearchFilter, DjangoFilterBackend]
     filterset_class = ProductFilter
-    search_fields = ["name", "description", "categories__name", "tags__name"]
 
     def get_serializer_class(self):
         """Use different serializers for list and detail views"""
@@ -65,53 +87,111 @@ class ProductViewSet(viewsets.ModelViewSet):
             return ProductDetailSerializer
         return ProductListSerializer
 
+    @catalog_condition
+    def retrieve(self, request, *args, **kwargs):
+        """Product page from the per-product cache (core.product_cache); ``?category=`` scoping uses SQL."""
+        if request.query_params.get("category"):
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            pk = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404("No Product matches the given query.")
+        product = get_product_detail(pk)
+        if product is None:
+            raise Http404("No Product matches the given query.")
+        # The same object-level checks get_object() runs, against the cached row
+        self.check_object_permissions(request, self.cached_instance(pk, product))
+        return Response(self.trim_cached(product))
+
+    def cached_instance(self, pk, data):
+        """An unsaved Product carrying the column values of a cached representation."""
+        columns = {field.attname for field in Product._meta.concrete_fields} - {"id"}
+        return Product(pk=pk, **{name: value for name, value in data.items() if name in columns})
+
+    def trim_cached(self, data):
+        """Apply ``?fields=``/``?expand=`` to a representation read from the product cache."""
+        selection = self.field_selection
+        return data if selection is None else selection.trim(data)
+
+    @catalog_condition
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get("facets") in ("1", "true") and isinstance(response.data, dict):
+            # Sidebar counts for the same filters, in the same response
+            response.data["facets"] = get_facets(self.filter_queryset(self.get_queryset()), request.query_params)
+        return response
+
+    def collection_response(self, name):
+        """
+        A merchandising collection served from its Redis sorted set and the product card
+        cache: no SQL once both are warm. Paginated when ``page``/``page_size`` is given,
+        otherwise the whole collection is streamed. ``?category=`` and a Redis outage
+        fall back to the SQL query.
+        """
+        request = self.request
+        queryset = self.get_queryset().filter(**{COLLECTIONS[name]: True})
+        if request.query_params.get("category"):
+            return self.list_response(queryset)
+
+        try:
+            collection = MerchandisingCollection(name)
+            pagination = StandardResultsSetPagination()
+            if {pagination.page_query_param, pagination.page_size_query_param} & set(request.query_params):
+                ids = pagination.paginate_queryset(collection, request, view=self)
+                return pagination.get_paginated_response([self.trim_cached(card) for card in get_product_cards(ids)])
+            ids = collection[:]
+        except RedisError as e:
+            logger.error(f"Merchandising collection '{name}' unavailable, using SQL: {str(e)}")
+            return self.list_response(queryset)
+
+        chunk = self.stream_chunk_size
+        cards = (
+            self.trim_cached(card)
+            for start in range(0, len(ids), chunk) for card in get_product_cards(ids[start:start + chunk])
+        )
+        return StreamingJSONResponse(cards)
+
     @action(detail=False, methods=["get"], url_path="featured")
+    @catalog_condition
     def featured(self, request):
-        qs = self.get_queryset().filter(is_featured=True)
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
+        return self.collection_response("featured")
 
     @action(detail=False, methods=["get"], url_path="trending")
+    @catalog_condition
     def trending(self, request):
-        qs = self.get_queryset().filter(is_trending=True)
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
+        return self.collection_response("trending")
 
     @action(detail=False, methods=["get"], url_path="new")
+    @catalog_condition
     def new(self, request):
-        qs = self.get_queryset().filter(is_new=True)
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
+        return self.collection_response("new")
 
     @action(detail=False, methods=["get"], url_path="sale")
+    @catalog_condition
     def sale(self, request):
-        qs = self.get_queryset().filter(is_sale=True)
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
+        return self.collection_response("sale")
 
     @action(detail=False, methods=["get"], url_path="category/(?P<slug>[^/.]+)")
+    @catalog_condition
     def category(self, request, slug=None):
-        qs = self.get_queryset().filter(categories__slug__iexact=slug)
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
+        qs = self.get_queryset().in_category(slug__iexact=slug)
+        return self.list_response(qs)
 
     @action(detail=True, methods=["get"], url_path="related")
     def related_products(self, request, pk=None):
         product = self.get_object()
 
         # Step 1: Same categories
-        related = self.get_queryset().filter(
-            categories__in=product.categories.all()
-        ).exclude(id=product.id)
+        related = self.get_queryset().in_categories(product.category_ids).exclude(id=product.id)
 
-        related_products = list(related.distinct()[:5])
+        related_products = list(related[:5])
         related_ids = {p.id for p in related_products}
 
         # Step 2: Fill with tag-related products if fewer than 5
-        if len(related_products) < 5 and product.tags.exists():
-            tag_related = Product.objects.filter(
-                tags__in=product.tags.all()
-            ).exclude(id__in=related_ids | {product.id}).distinct()
+        if len(related_products) < 5 and product.tag_ids:
+            tag_related = Product.objects.with_tags(product.tag_ids).exclude(
+                id__in=related_ids | {product.id}
+            )
 
             needed = 5 - len(related_products)
             related_products += list(tag_related[:needed])
@@ -119,6 +199,16 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(related_products, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], url_path="autocomplete")
+    def autocomplete(self, request):
+        """Search-box suggestions (ids and labels only) served from the in-process prefix index."""
+        query = request.query_params.get("q", "")
+        try:
+            limit = min(int(request.query_params.get("limit", 8)), 20)
+        except ValueError:
+            limit = 8
+        return Response({"results": autocomplete_index.search(query, limit)})
+
     @action(detail=False, methods=["get"], url_path="search")
     def search(self, request):
         query = request.query_params.get("q")
@@ -128,16 +218,20 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        qs = self.get_queryset().filter(
-            models.Q(name__icontains=query)
-            | models.Q(categories__name__icontains=query)
-            | models.Q(tags__name__icontains=query)
-        ).distinct()
+        # ?mode=fuzzy → typo tolerant trigram matching with "did you mean" suggestions
+        fuzzy = request.query_params.get("mode") == "fuzzy"
+        if fuzzy:
+            qs = fuzzy_search_products(self.get_queryset(), query)
+        else:
+            qs = search_products(self.get_queryset(), query)
 
         page = self.paginate_queryset(qs)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+            if fuzzy:
+                response.data["suggestions"] = suggest_terms(query)
+            return response
 
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
@@ -150,65 +244,67 @@ class ProductViewSet(viewsets.ModelViewSet):
     #     return queryset
 
     def get_queryset(self):
-        queryset = (
-            Product.objects.all()
-            .prefetch_related("categories", "tags")
-            .distinct()
-        )
+        # Relation filters are array predicates on the product row (see ProductQuerySet), so rows never need DISTINCT
+        queryset = Product.objects.all().prefetch_related("categories", "tags")
         category = self.request.query_params.get("category")
         if category:
-            queryset = queryset.filter(categories__name=category)
-        return queryset
+            queryset = queryset.in_category(name=category)
+        return self.sparse_queryset(queryset)
 
 
+@method_decorator(catalog_view_condition, name="retrieve")
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [RoleBasedSafeWritePermission]
 
-    def get_queryset(self):
-        # cache_key = 'all_categories'
-        # cached_categories = cache.get(cache_key)
-        #
-        # if cached_categories is None:
-        #     logger.info("Categories cache miss - fetching from database")
-        #     categories = Category.objects.all()
-        #     cache.set(cache_key, categories, timeout=3600)  # Cache for 1 hour
-        #     return categories
-        #
-        # logger.info("Categories retrieved from cache")
-        # return cached_categories
-        categories = Category.objects.all()
-        return categories
+    @catalog_condition
+    def list(self, request, *args, **kwargs):
+        # Categories with in-stock product counts, from the category catalog cache
+        catalog = self.sort_catalog(get_category_catalog())
+        page = self.paginate_queryset(catalog)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(catalog)
+
+    def sort_catalog(self, catalog):
+        """``?ordering=`` (validated by OrderingFilter, as on the queryset) applied to the cached catalog."""
+        ordering = OrderingFilter().get_ordering(self.request, self.get_queryset(), self)
+        for name in reversed(ordering or ()):
+            field = name.lstrip("-")
+            # NULLs last ascending and first descending, as in PostgreSQL
+            catalog = sorted(
+                catalog, key=lambda category: (category[field] is None, category[field]),
+                reverse=name.startswith("-"),
+            )
+        return catalog
 
     def perform_create(self, serializer):
         logger.info(f"Creating new category: {serializer.validated_data.get('name')}")
-        category = serializer.save()
-        # cache.delete('all_categories')
-        return category
+        return serializer.save()
 
     def perform_update(self, serializer):
         logger.info(f"Updating category: {serializer.instance.name}")
-        category = serializer.save()
-        # cache.delete('all_categories')
-        return category
+        return serializer.save()
 
     def perform_destroy(self, instance):
         logger.info(f"Deleting category: {instance.name}")
-        # cache.delete('all_categories')
         instance.delete()
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseFieldsMixin, StreamingListMixin, viewsets.ModelViewSet):
     """Customer and admin order endpoints."""
 
+    stream_actions = ("my_orders",)
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ("-created_at", "id")
     queryset = Order.objects.prefetch_related("items", "items__product").all()
     serializer_class = OrderSerializer
     permission_classes = [RoleBasedSafeWritePermission]
 
     def get_queryset(self):
         logger.info(f"Fetching orders for user: {self.request.user.username}")
-        qs = super().get_queryset()
+        qs = self.sparse_queryset(super().get_queryset())
         user = self.request.user
         if user.is_staff:
             return qs  # Admin sees all orders
@@ -217,8 +313,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="myorders")
     def my_orders(self, request):
         queryset = self.get_queryset().filter(user=request.user)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
 
     @action(detail=True, methods=["patch"], permission_classes=[IsAuthenticated, IsAdminOrReadOnly])
     def update_status(self, request, pk=None):
@@ -232,6 +327,18 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+class CacheStatsView(APIView):
+    """Hit/miss counters of the response caches and the catalog cache tiers in this worker process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        stats = {"responses": cache_metrics.stats()}
+        catalog_backend = caches[settings.CATALOG_CACHE_ALIAS]
+        if hasattr(catalog_backend, "stats"):
+            stats["catalog_cache"] = catalog_backend.stats()  # per-tier hit ratios of the two-tier cache
+        return Response(stats)
+
+
 class ContactView(APIView):
     permission_classes = [AllowAny]
 
@@ -346,15 +453,16 @@ class CartItemViewSet(viewsets.ModelViewSet):
         return serializer.save(cart=cart)
 
 
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = OrderItemSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = EstimatedCountPagination
 
     def get_queryset(self):
         logger.info(f"Fetching order items for user: {self.request.user.username}")
         if self.request.user.is_staff:
-            return OrderItem.objects.all()
-        return OrderItem.objects.filter(order__user=self.request.user)
+            return self.sparse_queryset(OrderItem.objects.all())
+        return self.sparse_queryset(OrderItem.objects.filter(order__user=self.request.user))
 
 
 class ShippingAddressViewSet(viewsets.ModelViewSet):
@@ -383,15 +491,20 @@ class StockNotificationViewSet(viewsets.ModelViewSet):
         return serializer.save(user=self.request.user)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+@method_decorator(catalog_view_condition, name="list")
+@method_decorator(catalog_view_condition, name="retrieve")
+class TagViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [RoleBasedSafeWritePermission]
+    list_cache_timeout = settings.TAG_LIST_CACHE_TIMEOUT
 
 
 class AppNotificationViewSet(viewsets.ModelViewSet):
     queryset = AppNotification.objects.all()
     serializer_class = AppNotificationSerializer
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ("-created_at", "id")
 
     def get_queryset(self):
         user = self.request.user